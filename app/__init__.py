@@ -1,26 +1,52 @@
 from flask import Flask
 from flask_cors import CORS
 from config import config
+from app.services.admission import init_admission
 from app.services.database import close_db
+from app.services.fuzzy import init_trigram_index
+from app.services.history_rollup import init_history_compactor
+from app.services.metrics import init_metrics
+from app.services.snapshot import init_snapshot
+from app.services.suggest import init_suggest_index
 
-def create_app(config_name='default'):
+def create_app(config_name='default', **overrides):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(overrides)
     CORS(app)
 
     with app.app_context():
         from app.services.init_db import init_db
         init_db()  # Initialize database tables
 
+    # Build the in-memory catalog in the background
+    init_snapshot(app)
+
+    # Suggest and fuzzy search indexes follow the catalog, rebuilt off the request path
+    init_suggest_index(app)
+    init_trigram_index(app)
+
+    # Roll old search history into daily counts in the background
+    init_history_compactor(app)
+
     # Register database teardown
     app.teardown_appcontext(close_db)
 
+    # Register request timing for /api/metrics
+    init_metrics(app)
+
+    # Shed API requests over their class's limits; after metrics so rejections are counted
+    init_admission(app)
+
     # Register blueprints
     from app.routes.api import api
     from app.routes.web import web
     
     app.register_blueprint(api, url_prefix='/api')
     app.register_blueprint(web)
+    if app.config['ASYNC_API']:
+        from app.routes.api_async import api_async
+        app.register_blueprint(api_async, url_prefix='/api/async')
 
     # Register error handlers
     @app.errorhandler(404)
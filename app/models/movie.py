@@ -1,5 +1,16 @@
-from typing import List, Dict, Optional
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.services.availability import decode
+from app.services.catalog import catalog_version
 from app.services.database import get_db
+from app.services.fuzzy import get_trigram_index
+from app.services.history_shards import trending_rows
+from app.services.history_writer import record_searches
+from app.services.json_fragments import dumps, get_fragment_cache
+from app.services.search_cache import get_search_cache, normalize_key
+from app.services.search_filters import SearchFilters
+from app.services.search_index import build_match_query, fts_available
+from app.services.snapshot import MovieRecord, get_snapshot
 
 class Movie:
     def __init__(self, id: int, title: str, release_year: int, view_count: int = None):
@@ -9,20 +20,59 @@ class Movie:
         self.view_count = view_count
         self._streaming_services = None
 
+    @classmethod
+    def from_row(cls, row, view_count: int = None) -> 'Movie':
+        """Build a movie from a Movies row that includes the availability column"""
+        movie = cls(row['id'], row['title'], row['release_year'], view_count)
+        movie._streaming_services = decode(row['availability'])
+        return movie
+
+    @classmethod
+    def from_record(cls, record: MovieRecord) -> 'Movie':
+        movie = cls(record.id, record.title, record.release_year)
+        movie._streaming_services = list(record.services)
+        return movie
+
     @property
     def streaming_services(self) -> List[str]:
         if self._streaming_services is None:
-            db = get_db()
-            cursor = db.cursor()
-            cursor.execute("""
-                SELECT s.service_name
-                FROM Streaming_Services s
-                JOIN Movie_Streamings ms ON s.id = ms.service_id
-                WHERE ms.movie_id = ?
-            """, (self.id,))
-            self._streaming_services = [row['service_name'] for row in cursor.fetchall()]
+            cursor = get_db().cursor()
+            cursor.execute("SELECT availability FROM Movies WHERE id = ?", (self.id,))
+            row = cursor.fetchone()
+            self._streaming_services = decode(row['availability']) if row else []
         return self._streaming_services
 
+    @staticmethod
+    def load_streaming_services(movies: List['Movie'], chunk_size: int = 500) -> List['Movie']:
+        """Fill streaming_services for a list of movies with one query per chunk of ids"""
+        snapshot = get_snapshot()
+        pending = defaultdict(list)
+        for movie in movies:
+            if movie._streaming_services is not None:
+                continue
+            record = snapshot.movies.get(movie.id) if snapshot is not None else None
+            if record is not None:
+                movie._streaming_services = list(record.services)
+            else:
+                pending[movie.id].append(movie)
+        if not pending:
+            return movies
+
+        services = {}
+        cursor = get_db().cursor()
+        ids = list(pending)
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT id, availability FROM Movies WHERE id IN ({placeholders})", chunk)
+            for row in cursor.fetchall():
+                services[row['id']] = decode(row['availability'])
+
+        for movie_id, pending_movies in pending.items():
+            for movie in pending_movies:
+                movie._streaming_services = services.get(movie_id, [])
+        return movies
+
     def to_dict(self, include_streaming: bool = True) -> Dict:
         result = {
             'id': self.id,
@@ -35,89 +85,316 @@ class Movie:
             result['view_count'] = self.view_count
         return result
 
+    def to_json(self, include_streaming: bool = True) -> bytes:
+        """Encoded to_dict()"""
+        return Movie.to_json_many([self], include_streaming)[0]
+
+    @staticmethod
+    def to_json_many(movies: List['Movie'], include_streaming: bool = True) -> List[bytes]:
+        """Encode each movie's to_dict(), reusing fragments cached for its snapshot record.
+
+        Movies missing from the snapshot, or whose title, year or loaded
+        streaming services differ from their record, e.g. rows read from SQL
+        ahead of a snapshot refresh, are encoded afresh.
+        """
+        snapshot = get_snapshot()
+        cache = get_fragment_cache()
+        records = {}
+        if snapshot is not None and cache is not None:
+            for position, movie in enumerate(movies):
+                record = snapshot.movies.get(movie.id)
+                if record is not None and Movie._matches(movie, record, include_streaming):
+                    records[position] = record
+
+        # Service names are part of the payload, so their version is part of the key
+        lookups = [((record.id, include_streaming), (record.version, snapshot.services_version))
+                   for record in records.values()]
+        cached = dict(zip(records, cache.get_many(lookups))) if records else {}
+
+        fragments = []
+        misses = []
+        for position, movie in enumerate(movies):
+            if position not in records:
+                fragments.append(dumps(movie.to_dict(include_streaming)))
+                continue
+            fragment = cached[position]
+            if fragment is None:
+                record = records[position]
+                fragment = dumps(Movie.from_record(record).to_dict(include_streaming))
+                misses.append(((record.id, include_streaming),
+                               (record.version, snapshot.services_version), fragment))
+            if movie.view_count is not None:
+                fragment = fragment[:-1] + b',"view_count":' + str(movie.view_count).encode() + b'}'
+            fragments.append(fragment)
+        if misses:
+            cache.put_many(misses)
+        return fragments
+
+    @staticmethod
+    def _matches(movie: 'Movie', record: MovieRecord, include_streaming: bool) -> bool:
+        """Whether the record's fragment encodes the same payload as the movie"""
+        if (record.title, record.release_year) != (movie.title, movie.release_year):
+            return False
+        # Unloaded services would be filled from this same record
+        services = movie._streaming_services
+        return not include_streaming or services is None or tuple(services) == tuple(record.services)
+
     def record_search(self):
         """Record a search for this movie"""
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(
-            "INSERT INTO Movie_Search_History (movie_id) VALUES (?)",
-            (self.id,)
-        )
-        db.commit()
+        record_searches([self.id])
+
+    @staticmethod
+    def search(query: str, year: Optional[int] = None, service: Optional[str] = None, *,
+               year_from: Optional[int] = None, year_to: Optional[int] = None,
+               service_match: str = 'any') -> List['Movie']:
+        """Search titles; service may list several comma-separated names, matched any or all"""
+        filters = SearchFilters.build(year, service, year_from, year_to, service_match)
+        movies = Movie._cached_search(query, filters)
+
+        # Record searches for found movies, cached or not, so trending stays correct
+        record_searches([movie.id for movie in movies])
+        return movies
 
     @staticmethod
-    def search(query: str, year: Optional[int] = None, service: Optional[str] = None) -> List['Movie']:
+    def search_page(query: str, year: Optional[int] = None, service: Optional[str] = None,
+                    limit: int = 50, after: Optional[Tuple[str, int]] = None, *,
+                    year_from: Optional[int] = None, year_to: Optional[int] = None,
+                    service_match: str = 'any') -> Tuple[List['Movie'], Optional[Tuple[str, int]]]:
+        """Get one page of results in (title, id) order and the keyset to continue after, if any"""
+        filters = SearchFilters.build(year, service, year_from, year_to, service_match)
+        movies = Movie._cached_search(query, filters, limit + 1, after)
+        next_after = None
+        if len(movies) > limit:
+            movies = movies[:limit]
+            next_after = (movies[-1].title, movies[-1].id)
+
+        record_searches([movie.id for movie in movies])
+        return movies, next_after
+
+    @staticmethod
+    def fuzzy_search(query: str, year: Optional[int] = None, service: Optional[str] = None,
+                     limit: int = 20, candidates: int = 200, *, year_from: Optional[int] = None,
+                     year_to: Optional[int] = None, service_match: str = 'any') -> List['Movie']:
+        """Typo-tolerant search: titles with a word close to each query word, closest first.
+
+        Filters are applied to the best candidates rather than the whole
+        catalog, so a narrow filter may return fewer than limit movies.
+        """
+        filters = SearchFilters.build(year, service, year_from, year_to, service_match)
+        ranked = get_trigram_index().search(query, candidates if filters.active else limit, candidates)
+        movies = Movie.get_many([movie_id for movie_id, _ in ranked])
+        if filters.active:
+            Movie.load_streaming_services(movies)
+            movies = [movie for movie in movies
+                      if filters.matches(movie.release_year, movie.streaming_services)][:limit]
+
+        record_searches([movie.id for movie in movies])
+        return movies
+
+    @staticmethod
+    def _cached_search(query: str, filters: SearchFilters, limit: Optional[int] = None,
+                       after: Optional[Tuple[str, int]] = None) -> List['Movie']:
         db = get_db()
+        cache = get_search_cache()
+        movies = None
+        version = None
+        if cache is not None:
+            key = normalize_key(query, filters) + (limit, after)
+            version = catalog_version(db)
+            movies = cache.get(key, version)
+
+        if movies is None:
+            movies = [Movie.from_row(row)
+                      for rows in Movie._search_rows(db, query, filters, limit, after, version=version)
+                      for row in rows]
+            if cache is not None:
+                cache.put(key, version, movies)
+        return list(movies)
+
+    @staticmethod
+    def iter_search(query: str, year: Optional[int] = None, service: Optional[str] = None,
+                    limit: Optional[int] = None, after: Optional[Tuple[str, int]] = None,
+                    chunk_size: int = 500, *, year_from: Optional[int] = None,
+                    year_to: Optional[int] = None, service_match: str = 'any') -> Iterator[List['Movie']]:
+        """Yield search results in chunks straight off the cursor, bypassing the cache"""
+        filters = SearchFilters.build(year, service, year_from, year_to, service_match)
+        for rows in Movie._search_rows(get_db(), query, filters, limit, after, chunk_size):
+            movies = [Movie.from_row(row) for row in rows]
+            record_searches([movie.id for movie in movies])
+            yield movies
+
+    @staticmethod
+    def _search_rows(db, query: str, filters: SearchFilters, limit: Optional[int],
+                     after: Optional[Tuple[str, int]], chunk_size: int = 500,
+                     version: Optional[int] = None) -> Iterator[List]:
+        """Yield chunks of matching rows.
+
+        With a catalog snapshot as current as the database (version, when the
+        caller already read it), SQL only matches titles and the service and
+        year filters are applied as one bitmap intersection over the
+        candidates; otherwise SQL applies every filter.
+        """
+        snapshot = get_snapshot() if filters.active else None
+        # A snapshot still catching up would drop newly added or newly streaming movies
+        if snapshot is not None and snapshot.version != (catalog_version(db) if version is None else version):
+            snapshot = None
         cursor = db.cursor()
+        if snapshot is None:
+            cursor.execute(*Movie._search_sql(query, filters, limit, after))
+            allowed = None
+        else:
+            allowed = snapshot.filter_bitmap(filters)
+            if not allowed:
+                return
+            cursor.execute(*Movie._search_sql(query, SearchFilters(), None, after,
+                                              keyset=limit is not None))
+
+        remaining = limit
+        while remaining is None or remaining > 0:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            if allowed is not None:
+                rows = [row for row in rows if row['id'] in allowed]
+                if remaining is not None:
+                    rows = rows[:remaining]
+                    remaining -= len(rows)
+            if rows:
+                yield rows
 
-        query_parts = [
-            "SELECT DISTINCT m.id, m.title, m.release_year",
-            "FROM Movies m"
-        ]
-        params = []
+    @staticmethod
+    def _search_sql(query: str, filters: SearchFilters, limit: Optional[int],
+                    after: Optional[Tuple[str, int]], keyset: bool = False) -> Tuple[str, List]:
+        match = build_match_query(query) if fts_available() else None
+        keyset = keyset or limit is not None or after is not None
+
+        if match:
+            query_parts = [
+                "SELECT m.id, m.title, m.release_year, m.availability, f.rank",
+                "FROM Movies_FTS f",
+                "JOIN Movies m ON m.id = f.rowid",
+                "WHERE Movies_FTS MATCH ?"
+            ]
+            params = [match]
+        else:
+            query_parts = [
+                "SELECT m.id, m.title, m.release_year, m.availability",
+                "FROM Movies m",
+                "WHERE m.title LIKE ?"  # A leading % cannot seek an index: this scans Movies
+            ]
+            params = [f'%{query}%']
 
-        if service:
+        if filters.services:
+            placeholders = ", ".join("?" * len(filters.services))
             query_parts.extend([
-                "JOIN Movie_Streamings ms ON m.id = ms.movie_id",
+                "AND m.id IN (",
+                "SELECT ms.movie_id FROM Movie_Streamings ms",
                 "JOIN Streaming_Services s ON ms.service_id = s.id",
-                "WHERE LOWER(s.service_name) = LOWER(?)"
+                f"WHERE LOWER(s.service_name) IN ({placeholders})"
             ])
-            params.append(service)
-        else:
-            query_parts.append("WHERE 1=1")
+            params.extend(filters.services)
+            if filters.match_all:
+                query_parts.append("GROUP BY ms.movie_id HAVING COUNT(DISTINCT LOWER(s.service_name)) = ?")
+                params.append(len(filters.services))
+            query_parts.append(")")
 
-        query_parts.append("AND LOWER(m.title) LIKE LOWER(?)")
-        params.append(f'%{query}%')
+        if filters.year_from is not None:
+            query_parts.append("AND m.release_year >= ?")
+            params.append(filters.year_from)
 
-        if year:
-            query_parts.append("AND m.release_year = ?")
-            params.append(year)
+        if filters.year_to is not None:
+            query_parts.append("AND m.release_year <= ?")
+            params.append(filters.year_to)
 
-        query_parts.append("ORDER BY m.title")
+        if after is not None:
+            query_parts.append("AND (m.title > ? OR (m.title = ? AND m.id > ?))")
+            params.extend([after[0], after[0], after[1]])
 
-        cursor.execute(" ".join(query_parts), params)
-        movies = [Movie(row['id'], row['title'], row['release_year'])
-                 for row in cursor.fetchall()]
-        
-        # Record searches for found movies
-        for movie in movies:
-            movie.record_search()
-        
-        return movies
+        if keyset:
+            query_parts.append("ORDER BY m.title, m.id")
+        else:
+            query_parts.append("ORDER BY f.rank, m.title" if match else "ORDER BY m.title")
+
+        if limit is not None:
+            query_parts.append("LIMIT ?")
+            params.append(limit)
+
+        return " ".join(query_parts), params
 
     @staticmethod
     def get_by_id(movie_id: int) -> Optional['Movie']:
+        snapshot = get_snapshot()
+        if snapshot is not None and movie_id in snapshot.movies:
+            return Movie.from_record(snapshot.movies[movie_id])
+
+        # Not in the snapshot yet, e.g. added since the last refresh
         db = get_db()
         cursor = db.cursor()
         cursor.execute(
-            "SELECT id, title, release_year FROM Movies WHERE id = ?",
+            "SELECT id, title, release_year, availability FROM Movies WHERE id = ?",
             (movie_id,)
         )
         row = cursor.fetchone()
-        return Movie(row['id'], row['title'], row['release_year']) if row else None
+        return Movie.from_row(row) if row else None
 
     @staticmethod
-    def get_trending(limit: int = 10) -> List['Movie']:
-        """Get trending movies based on search frequency"""
+    def get_many(movie_ids: List[int], chunk_size: int = 500) -> List['Movie']:
+        """Get movies in the order of movie_ids, skipping unknown ids, with one query per chunk of misses"""
+        snapshot = get_snapshot()
+        found = {}
+        missing = []
+        for movie_id in movie_ids:
+            if snapshot is not None and movie_id in snapshot.movies:
+                found[movie_id] = Movie.from_record(snapshot.movies[movie_id])
+            else:
+                missing.append(movie_id)
+
+        cursor = get_db().cursor() if missing else None
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT id, title, release_year, availability FROM Movies WHERE id IN ({placeholders})", chunk
+            )
+            for row in cursor.fetchall():
+                found[row['id']] = Movie.from_row(row)
+        return [found[movie_id] for movie_id in movie_ids if movie_id in found]
+
+    @staticmethod
+    def get_trending(limit: int = 10, window: str = 'all') -> List['Movie']:
+        """Get trending movies based on search frequency within a window"""
+        return Movie.get_trending_page(limit, window)[0]
+
+    @staticmethod
+    def get_trending_page(limit: int = 10, window: str = 'all',
+                          after: Optional[Tuple[float, int]] = None) -> Tuple[List['Movie'], Optional[Tuple[float, int]]]:
+        """Get one page of trending movies and the keyset to continue after, if any"""
         db = get_db()
         cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                m.id,
-                m.title,
-                m.release_year,
-                COUNT(msh.id) as view_count
-            FROM Movies m
-            LEFT JOIN Movie_Search_History msh ON m.id = msh.movie_id
-            GROUP BY m.id
-            ORDER BY view_count DESC
-            LIMIT ?
-        """, (limit,))
-        
-        return [Movie(
-            row['id'], 
-            row['title'], 
-            row['release_year'], 
-            row['view_count']
-        ) for row in cursor.fetchall()] 
\ No newline at end of file
+        ranked = trending_rows(db, window, limit + 1, after)
+        next_after = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            next_after = (ranked[-1][2], ranked[-1][0])
+
+        # Fetch the ranked rows, and on the first page pad with unsearched movies, in one query
+        ranked_ids = [movie_id for movie_id, _, _ in ranked]
+        padding = limit - len(ranked_ids) if after is None else 0
+        placeholders = ", ".join("?" * len(ranked_ids))
+        cursor.execute(f"""
+            SELECT id, title, release_year, availability FROM Movies WHERE id IN ({placeholders})
+            UNION ALL
+            SELECT * FROM (
+                SELECT id, title, release_year, availability FROM Movies
+                WHERE id NOT IN ({placeholders})
+                ORDER BY id
+                LIMIT ?
+            )
+        """, ranked_ids + ranked_ids + [padding])
+        rows = {row['id']: row for row in cursor.fetchall()}
+
+        view_counts = {movie_id: view_count for movie_id, view_count, _ in ranked}
+        ordered_ids = [movie_id for movie_id in ranked_ids if movie_id in rows]
+        ordered_ids += [movie_id for movie_id in rows if movie_id not in view_counts]
+        movies = [Movie.from_row(rows[movie_id], view_counts.get(movie_id, 0)) for movie_id in ordered_ids]
+        return movies, next_after
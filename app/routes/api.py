@@ -1,89 +1,336 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.models.movie import Movie
-from typing import Optional
+from app.services.admission import get_admission
+from typing import Dict, List, Optional, Tuple
 from flask import current_app
-from app.services.database import get_db
+from app.services.catalog import movie_etag, services_etag
+from app.services.database import get_db, get_pool
+from app.services.json_fragments import dumps, get_fragment_cache, json_response, splice_results
+from app.services.metrics import get_metrics
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.search_cache import get_search_cache
+from app.services.search_filters import SERVICE_MATCH_MODES
+from app.services.snapshot import get_snapshot
+from app.services.suggest import MAX_SUGGESTIONS, get_suggest_index
+from app.services.trending import DECAY_WINDOW, TRENDING_WINDOWS
 
 api = Blueprint('api', __name__)
 
-@api.route('/movies/search')
-def search_movies():
-    query = request.args.get('q', '').strip()
-    year = request.args.get('year', type=int)
-    service = request.args.get('service')
+def _page_args(cursor_types: Tuple[type, ...], default_limit: Optional[int]) -> Tuple[Optional[int], Optional[Tuple]]:
+    """Parse the limit/cursor query parameters, raising ValueError when invalid"""
+    limit = request.args.get('limit')
+    token = request.args.get('cursor')
+    if limit is None:
+        limit = current_app.config['API_DEFAULT_PAGE_SIZE'] if token else default_limit
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        max_limit = current_app.config['API_MAX_PAGE_SIZE']
+        if not 1 <= limit <= max_limit:
+            raise ValueError(f"limit must be between 1 and {max_limit}")
+    after = decode_cursor(token, cursor_types) if token else None
+    return limit, after
 
-    if not query:
-        return jsonify({
-            "error": "Invalid input",
-            "message": "Search query is required"
-        }), 400
+def _cacheable(response: Response, etag: Optional[str]) -> Response:
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = current_app.config['CATALOG_CACHE_CONTROL']
+    return response
 
-    if len(query) < 2:
-        return jsonify({
-            "error": "Invalid input",
-            "message": "Search query must be at least 2 characters"
-        }), 400
+def _not_modified(etag: Optional[str]) -> Optional[Response]:
+    """Answer a matching If-None-Match with a bodyless 304"""
+    if etag is not None and request.if_none_match.contains(etag):
+        return _cacheable(Response(status=304), etag)
+    return None
 
-    movies = Movie.search(query, year, service)
-    
+def _movie_etag(movie_id: int) -> Optional[str]:
+    snapshot = get_snapshot()
+    if snapshot is not None and movie_id in snapshot.movies:
+        return snapshot.movie_etag(movie_id)
+    return movie_etag(get_db(), movie_id)
+
+def _invalid_input(message: str):
     return jsonify({
-        "results": [movie.to_dict() for movie in movies],
+        "error": "Invalid input",
+        "message": message
+    }), 400
+
+def _movie_not_found(movie_id: int):
+    return jsonify({
+        "error": "Not found",
+        "message": f"Movie with ID {movie_id} not found"
+    }), 404
+
+def _search_args() -> Tuple[str, Optional[int], Optional[str], Dict]:
+    """Parse the search query and filters, raising ValueError when invalid"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        raise ValueError("Search query is required")
+    if len(query) < 2:
+        raise ValueError("Search query must be at least 2 characters")
+
+    filter_args = {
+        "year_from": request.args.get('year_from', type=int),
+        "year_to": request.args.get('year_to', type=int),
+        "service_match": request.args.get('service_match', 'any')
+    }
+    if filter_args['service_match'] not in SERVICE_MATCH_MODES:
+        raise ValueError(f"service_match must be one of {', '.join(SERVICE_MATCH_MODES)}")
+    return query, request.args.get('year', type=int), request.args.get('service'), filter_args
+
+def _search_body(query: str, year: Optional[int], service: Optional[str],
+                 limit: Optional[int], after: Optional[Tuple], filter_args: Dict,
+                 fuzzy: bool = False) -> bytes:
+    next_after = None
+    if fuzzy:
+        movies = Movie.fuzzy_search(
+            query, year, service, limit or current_app.config['FUZZY_SEARCH_LIMIT'],
+            current_app.config['FUZZY_CANDIDATES'], **filter_args
+        )
+    elif limit is None:
+        movies = Movie.search(query, year, service, **filter_args)
+    else:
+        movies, next_after = Movie.search_page(query, year, service, limit, after, **filter_args)
+    Movie.load_streaming_services(movies)
+
+    return splice_results(Movie.to_json_many(movies), {
         "count": len(movies),
         "query": query,
+        "fuzzy": fuzzy,
         "filters": {
             "year": year,
-            "service": service
-        }
+            "service": service,
+            **filter_args
+        },
+        "next_cursor": encode_cursor(next_after)
     })
 
-@api.route('/movies/<int:movie_id>')
-def get_movie(movie_id: int):
+def _batch_body(ids: List[int]) -> bytes:
+    movies = Movie.load_streaming_services(Movie.get_many(ids))
+    found = {movie.id for movie in movies}
+    return splice_results(Movie.to_json_many(movies), {
+        "count": len(movies),
+        "missing": [movie_id for movie_id in ids if movie_id not in found]
+    })
+
+def _movie_body(movie_id: int) -> Optional[bytes]:
     movie = Movie.get_by_id(movie_id)
-    if not movie:
-        return jsonify({
-            "error": "Not found",
-            "message": f"Movie with ID {movie_id} not found"
-        }), 404
-    
-    return jsonify(movie.to_dict())
+    return movie.to_json() if movie else None
 
-@api.route('/movies/<int:movie_id>/streaming')
-def get_movie_streaming(movie_id: int):
+def _streaming_payload(movie_id: int) -> Optional[Dict]:
     movie = Movie.get_by_id(movie_id)
     if not movie:
-        return jsonify({
-            "error": "Not found",
-            "message": f"Movie with ID {movie_id} not found"
-        }), 404
-    
-    return jsonify({
+        return None
+    return {
         "movie_id": movie.id,
         "title": movie.title,
         "streaming_services": movie.streaming_services
+    }
+
+def _trending_window() -> str:
+    """Parse the trending window, raising ValueError when unknown"""
+    window = request.args.get('window', 'all')
+    if window not in TRENDING_WINDOWS and window != DECAY_WINDOW:
+        raise ValueError(f"Unknown trending window '{window}'")
+    return window
+
+def _trending_body(limit: int, window: str, after: Optional[Tuple]) -> bytes:
+    movies, next_after = Movie.get_trending_page(limit, window, after)
+    Movie.load_streaming_services(movies)
+    return splice_results(Movie.to_json_many(movies), {
+        "count": len(movies),
+        "window": window,
+        "next_cursor": encode_cursor(next_after)
     })
 
+def _services_etag() -> Optional[str]:
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.services_etag()
+    return services_etag(get_db())
+
+def _service_names() -> List[str]:
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return list(snapshot.services)
+    cursor = get_db().cursor()
+    cursor.execute("SELECT service_name FROM Streaming_Services ORDER BY service_name")
+    return [row['service_name'] for row in cursor.fetchall()]
+
+def _stream_search(query: str, year: Optional[int], service: Optional[str],
+                   limit: Optional[int], after: Optional[Tuple], filter_args: Dict) -> Response:
+    """Serialize search results chunk by chunk as they come off the cursor"""
+    def generate():
+        yield b'{"results":['
+        count = 0
+        last = None
+        for chunk in Movie.iter_search(query, year, service, limit, after, **filter_args):
+            Movie.load_streaming_services(chunk)
+            for fragment in Movie.to_json_many(chunk):
+                yield (b',' if count else b'') + fragment
+                count += 1
+            last = chunk[-1]
+        next_cursor = None
+        if limit is not None and count == limit:
+            next_cursor = encode_cursor((last.title, last.id))
+        # Reuse dumps for the trailing fields, minus its opening brace
+        yield b'],' + dumps({
+            "count": count,
+            "query": query,
+            "fuzzy": False,
+            "filters": {
+                "year": year,
+                "service": service,
+                **filter_args
+            },
+            "next_cursor": next_cursor
+        })[1:]
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def _fuzzy_arg() -> bool:
+    """Parse fuzzy=1, raising ValueError when combined with a cursor"""
+    fuzzy = bool(request.args.get('fuzzy', type=int))
+    if fuzzy and request.args.get('cursor'):
+        raise ValueError("cursor is not supported with fuzzy search")
+    return fuzzy
+
+@api.route('/movies/search')
+def search_movies():
+    try:
+        query, year, service, filter_args = _search_args()
+        limit, after = _page_args((str, int), default_limit=None)
+        fuzzy = _fuzzy_arg()
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    if request.args.get('stream', type=int) and not fuzzy:
+        return _stream_search(query, year, service, limit, after, filter_args)
+
+    return json_response(_search_body(query, year, service, limit, after, filter_args, fuzzy))
+
+def _batch_ids() -> List[int]:
+    """Parse ids from ?ids=1,2,3 or a JSON body {"ids": [1, 2, 3]}, raising ValueError when invalid"""
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        ids = body.get('ids') if isinstance(body, dict) else None
+        if not isinstance(ids, list):
+            raise ValueError("Request body must be a JSON object with an ids list")
+        if any(isinstance(movie_id, (bool, float)) for movie_id in ids):
+            raise ValueError("ids must be integers")
+    else:
+        ids = [movie_id for movie_id in request.args.get('ids', '').split(',') if movie_id.strip()]
+    try:
+        ids = [int(movie_id) for movie_id in ids]
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers")
+    max_ids = current_app.config['API_MAX_BATCH_SIZE']
+    ids = list(dict.fromkeys(ids))
+    if not 1 <= len(ids) <= max_ids:
+        raise ValueError(f"Between 1 and {max_ids} ids are required")
+    return ids
+
+@api.route('/movies', methods=['GET', 'POST'])
+def get_movies():
+    """Batch lookup of movies with their streaming services"""
+    try:
+        ids = _batch_ids()
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    return json_response(_batch_body(ids))
+
+@api.route('/movies/suggest')
+def suggest_movies():
+    """Typeahead: titles with a word starting with q, most searched first; records no history"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', type=int) or current_app.config['SUGGEST_LIMIT']
+    suggestions = get_suggest_index().suggest(query, max(1, min(limit, MAX_SUGGESTIONS)))
+    return jsonify({
+        "query": query,
+        "suggestions": [{"id": movie_id, "title": title} for movie_id, title in suggestions]
+    })
+
+@api.route('/movies/<int:movie_id>')
+def get_movie(movie_id: int):
+    etag = _movie_etag(movie_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    movie = _movie_body(movie_id)
+    if not movie:
+        return _movie_not_found(movie_id)
+    
+    return _cacheable(json_response(movie), etag)
+
+@api.route('/movies/<int:movie_id>/streaming')
+def get_movie_streaming(movie_id: int):
+    etag = _movie_etag(movie_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    streaming = _streaming_payload(movie_id)
+    if not streaming:
+        return _movie_not_found(movie_id)
+    
+    return _cacheable(jsonify(streaming), etag)
+
 @api.route('/health')
 def health_check():
     db = get_db()
+    cache = get_search_cache()
     if db:
         return jsonify({
             "status": "healthy",
-            "database": "connected"
+            "database": "connected",
+            "pool": get_pool().stats(),
+            "search_cache": cache.stats() if cache else None
         })
     return jsonify({
         "status": "unhealthy",
         "database": "disconnected"
     }), 500
 
+@api.route('/metrics')
+def metrics():
+    """Export request, SQL and service counters in Prometheus text format"""
+    gauges = {"db_pool": get_pool().stats()}
+    cache = get_search_cache()
+    if cache is not None:
+        gauges["search_cache"] = cache.stats()
+    fragments = get_fragment_cache()
+    if fragments is not None:
+        gauges["json_fragments"] = fragments.stats()
+    writer = current_app.extensions.get('history_writer')
+    if writer is not None:
+        gauges["history_writer"] = {"written": writer.written, "dropped": writer.dropped}
+    executor = current_app.extensions.get('db_executor')
+    if executor is not None:
+        gauges["db_executor"] = executor.stats()
+    compactor = current_app.extensions.get('history_compactor')
+    if compactor is not None:
+        gauges["history_compactor"] = {"compacted": compactor.compacted}
+    admission = get_admission()
+    if admission is not None:
+        gauges["admission"] = admission.stats()
+
+    return Response(get_metrics().render(gauges), mimetype='text/plain; version=0.0.4')
+
 @api.route('/movies/trending')
 def get_trending_movies():
     """Get most searched/popular movies"""
     try:
-        movies = Movie.get_trending(limit=10)  # Get top 10 trending movies
-        return jsonify({
-            "results": [movie.to_dict() for movie in movies],
-            "count": len(movies)
-        })
+        window = _trending_window()
+        limit, after = _page_args((float, int), default_limit=10)  # Top 10 trending movies by default
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    try:
+        return json_response(_trending_body(limit, window, after))
     except Exception as e:
         current_app.logger.error(f"Error fetching trending movies: {e}")
         return jsonify({
@@ -95,16 +342,17 @@ def get_trending_movies():
 def get_streaming_services():
     """Get all available streaming services"""
     try:
-        cursor = get_db().cursor()
-        cursor.execute("SELECT service_name FROM Streaming_Services ORDER BY service_name")
-        services = [row['service_name'] for row in cursor.fetchall()]
+        etag = _services_etag()
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
         
-        return jsonify({
-            "services": services
-        })
+        return _cacheable(jsonify({
+            "services": _service_names()
+        }), etag)
     except Exception as e:
         current_app.logger.error(f"Error fetching streaming services: {e}")
         return jsonify({
             "error": "Server error",
             "message": "Failed to fetch streaming services"
-        }), 500 
\ No newline at end of file
+        }), 500
\ No newline at end of file
@@ -0,0 +1,128 @@
+import asyncio
+from flask import Blueprint, current_app, jsonify, request
+from app.routes.api import (
+    _batch_body, _batch_ids, _cacheable, _fuzzy_arg, _invalid_input, _movie_body, _movie_etag,
+    _movie_not_found, _not_modified, _page_args, _search_args, _search_body, _service_names,
+    _services_etag, _streaming_payload, _trending_body, _trending_window
+)
+from app.services.database import PoolTimeout
+from app.services.db_executor import DatabaseBusy, run_db
+from app.services.json_fragments import dumps, json_response
+
+# Same routes and responses as the api blueprint, with database work awaited on
+# the bounded executor. Under WSGI the request thread still waits for the view to
+# finish; the executor caps SQL in flight and lets one view run queries concurrently
+api_async = Blueprint('api_async', __name__)
+
+@api_async.errorhandler(DatabaseBusy)
+@api_async.errorhandler(PoolTimeout)
+def database_busy(error):
+    response = jsonify({
+        "error": "Service unavailable",
+        "message": "Too many database requests in flight, retry shortly"
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@api_async.route('/movies/search')
+async def search_movies():
+    """Search movies; stream=1 is not supported here and returns the full response"""
+    try:
+        query, year, service, filter_args = _search_args()
+        limit, after = _page_args((str, int), default_limit=None)
+        fuzzy = _fuzzy_arg()
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    return json_response(await run_db(_search_body, query, year, service, limit, after, filter_args, fuzzy))
+
+@api_async.route('/movies', methods=['GET', 'POST'])
+async def get_movies():
+    """Batch lookup of movies with their streaming services"""
+    try:
+        ids = _batch_ids()
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    return json_response(await run_db(_batch_body, ids))
+
+@api_async.route('/movies/<int:movie_id>')
+async def get_movie(movie_id: int):
+    etag = await run_db(_movie_etag, movie_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    movie = await run_db(_movie_body, movie_id)
+    if not movie:
+        return _movie_not_found(movie_id)
+
+    return _cacheable(json_response(movie), etag)
+
+@api_async.route('/movies/<int:movie_id>/streaming')
+async def get_movie_streaming(movie_id: int):
+    etag = await run_db(_movie_etag, movie_id)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    streaming = await run_db(_streaming_payload, movie_id)
+    if not streaming:
+        return _movie_not_found(movie_id)
+
+    return _cacheable(jsonify(streaming), etag)
+
+@api_async.route('/movies/trending')
+async def get_trending_movies():
+    """Get most searched/popular movies"""
+    try:
+        window = _trending_window()
+        limit, after = _page_args((float, int), default_limit=10)
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    try:
+        return json_response(await run_db(_trending_body, limit, window, after))
+    except (DatabaseBusy, PoolTimeout):
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Error fetching trending movies: {e}")
+        return jsonify({
+            "error": "Server error",
+            "message": "Failed to fetch trending movies"
+        }), 500
+
+@api_async.route('/services')
+async def get_streaming_services():
+    """Get all available streaming services"""
+    etag = await run_db(_services_etag)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    return _cacheable(jsonify({
+        "services": await run_db(_service_names)
+    }), etag)
+
+@api_async.route('/home')
+async def home():
+    """Trending movies and services, plus search results when q is given, queried concurrently"""
+    try:
+        window = _trending_window()
+        search = _search_args() if request.args.get('q') else None
+        fuzzy = _fuzzy_arg()
+    except ValueError as e:
+        return _invalid_input(str(e))
+
+    calls = [run_db(_trending_body, 10, window, None), run_db(_service_names)]
+    if search is not None:
+        query, year, service, filter_args = search
+        calls.append(run_db(_search_body, query, year, service, None, None, filter_args, fuzzy))
+    trending, services, *searched = await asyncio.gather(*calls)
+
+    # The trending and search bodies are already encoded, so splice them in
+    return json_response(
+        b'{"trending":' + trending
+        + b',"services":' + dumps(services)
+        + b',"search":' + (searched[0] if searched else b'null') + b'}'
+    )
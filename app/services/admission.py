@@ -0,0 +1,149 @@
+"""Per-endpoint admission control.
+
+API endpoints fall into request classes, each with its own concurrency
+limit and token bucket from ADMISSION_LIMITS. A request over either limit
+is answered straight away, 503 when its class is at capacity and 429 when
+its bucket is empty, with a Retry-After header, rather than queueing behind
+the requests already running. As classes never borrow each other's slots,
+a burst of broad searches cannot take the capacity health checks and cheap
+lookups rely on.
+
+Each limit follows the resource its class holds. Searches and health
+checks each hold a pooled connection, so together their limits stay below
+DB_POOL_SIZE, leaving connections for the lookups that need SQL. Lookups
+are mostly served from the catalog snapshot, and /api/async requests run
+their SQL on the ASYNC_DB_WORKERS executor, so neither counts against the
+pool.
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from flask import current_app, g, jsonify, request
+
+# /api endpoints whose cost grows with the request, and health checks; every
+# other /api endpoint is a lookup, and every /api/async endpoint is async
+ENDPOINT_CLASSES = {
+    'api.search_movies': 'search',
+    'api.get_movies': 'search',
+    'api.health_check': 'health',
+    'api.metrics': 'health',
+}
+
+# Classes whose requests hold a connection from the pool for their whole run
+POOL_CLASSES = ('search', 'health')
+
+class TokenBucket:
+    """Allow rate requests per second on average, with bursts of up to burst"""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+class RequestClass:
+    """Concurrency limit and optional token bucket shared by one class of endpoints"""
+
+    def __init__(self, name: str, max_concurrent: Optional[int], rate: Optional[float] = None,
+                 burst: Optional[int] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.bucket = TokenBucket(rate, burst or max(1, math.ceil(rate))) if rate else None
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.over_capacity = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> Optional[Tuple[int, float]]:
+        """Take a slot, or return the (status, retry after) to reject the request with"""
+        with self._lock:
+            if self.max_concurrent is not None and self.in_flight >= self.max_concurrent:
+                self.over_capacity += 1
+                return 503, 1.0
+            if self.bucket is not None:
+                wait = self.bucket.take()
+                if wait:
+                    self.rate_limited += 1
+                    return 429, wait
+            self.in_flight += 1
+            return None
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+class AdmissionControl:
+    def __init__(self, limits: Dict[str, Tuple[Optional[int], Optional[float], Optional[int]]], pool_size: int):
+        unbounded = [name for name in POOL_CLASSES if limits.get(name, (None,))[0] is None]
+        if unbounded:
+            raise ValueError(f"ADMISSION_LIMITS needs a concurrency limit for {', '.join(unbounded)}")
+        pooled = sum(limits[name][0] for name in POOL_CLASSES)
+        if pooled >= pool_size:
+            raise ValueError(f"ADMISSION_LIMITS let {pooled} search and health requests hold connections but "
+                             f"DB_POOL_SIZE is {pool_size}; leave at least one for lookups")
+        self.classes = {name: RequestClass(name, *limit) for name, limit in limits.items()}
+
+    def request_class(self, endpoint: Optional[str], blueprint: Optional[str]) -> Optional[RequestClass]:
+        if blueprint == 'api_async':
+            return self.classes.get('async')
+        if blueprint == 'api':
+            return self.classes.get(ENDPOINT_CLASSES.get(endpoint, 'lookup'))
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        stats = {}
+        for name, limiter in self.classes.items():
+            stats[f"{name}_in_flight"] = limiter.in_flight
+            stats[f"{name}_rate_limited"] = limiter.rate_limited
+            stats[f"{name}_over_capacity"] = limiter.over_capacity
+        return stats
+
+def get_admission() -> Optional[AdmissionControl]:
+    return current_app.extensions.get('admission')
+
+def _rejected(status: int, retry_after: float):
+    if status == 429:
+        body = {"error": "Too many requests", "message": "Rate limit exceeded, retry shortly"}
+    else:
+        body = {"error": "Service unavailable", "message": "Too many requests in flight, retry shortly"}
+    response = jsonify(body)
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status
+
+def init_admission(app):
+    """Limit API requests per class from ADMISSION_LIMITS unless ADMISSION_CONTROL is off"""
+    if not app.config['ADMISSION_CONTROL']:
+        return
+    app.extensions['admission'] = AdmissionControl(app.config['ADMISSION_LIMITS'], app.config['DB_POOL_SIZE'])
+
+    @app.before_request
+    def admit_request():
+        limiter = app.extensions['admission'].request_class(request.endpoint, request.blueprint)
+        if limiter is None:
+            return None
+        rejected = limiter.admit()
+        if rejected:
+            return _rejected(*rejected)
+        g.admitted = limiter
+        return None
+
+    # Runs once a streamed response has been fully sent, so the slot covers the whole request
+    @app.teardown_request
+    def release_request(error=None):
+        limiter = g.pop('admitted', None)
+        if limiter is not None:
+            limiter.release()
@@ -0,0 +1,117 @@
+"""Denormalized streaming availability on Movies.
+
+Movies.availability holds a movie's service names in service id order,
+joined by SEPARATOR, so serializing a movie needs no join. Triggers on
+Movie_Streamings and Streaming_Services keep it current; bulk loads that
+drop those triggers rebuild it with rebuild_availability. To check a
+database, or repair it:
+
+    python -m app.services.availability [--rebuild]
+"""
+import argparse
+import sqlite3
+from typing import Iterator, List, Tuple
+
+# ASCII unit separator: cannot appear in a service name typed by a person
+SEPARATOR = '\x1f'
+
+# A movie's availability computed from the relation tables
+_NAMES = """COALESCE((
+            SELECT group_concat(service_name, char(31)) FROM (
+                SELECT s.service_name FROM Movie_Streamings ms
+                JOIN Streaming_Services s ON s.id = ms.service_id
+                WHERE ms.movie_id = {movie_id} ORDER BY s.id
+            )
+        ), '')"""
+
+_REFRESH_MOVIE = f"""
+        UPDATE Movies SET availability = {_NAMES.format(movie_id='Movies.id')}
+        WHERE id = {{movie_id}};
+"""
+
+_REFRESH_SERVICE = f"""
+        UPDATE Movies SET availability = {_NAMES.format(movie_id='Movies.id')}
+        WHERE id IN (SELECT movie_id FROM Movie_Streamings WHERE service_id = {{service_id}});
+"""
+
+AVAILABILITY_SCHEMA = "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS availability_{name} AFTER {event} BEGIN{body}    END;
+""" for name, event, body in (
+    ('streamings_insert', 'INSERT ON Movie_Streamings', _REFRESH_MOVIE.format(movie_id='new.movie_id')),
+    ('streamings_update', 'UPDATE ON Movie_Streamings', _REFRESH_MOVIE.format(movie_id='old.movie_id')
+                                                        + _REFRESH_MOVIE.format(movie_id='new.movie_id')),
+    ('streamings_delete', 'DELETE ON Movie_Streamings', _REFRESH_MOVIE.format(movie_id='old.movie_id')),
+    ('services_update', 'UPDATE OF service_name ON Streaming_Services',
+     _REFRESH_SERVICE.format(service_id='new.id')),
+    ('services_delete', 'DELETE ON Streaming_Services', _REFRESH_SERVICE.format(service_id='old.id')),
+))
+
+def decode(availability: str) -> List[str]:
+    return availability.split(SEPARATOR) if availability else []
+
+def init_availability(conn: sqlite3.Connection):
+    """Add Movies.availability, its triggers, and fill it for existing movies"""
+    cursor = conn.cursor()
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(Movies)")}
+    if 'availability' not in columns:
+        cursor.execute("ALTER TABLE Movies ADD COLUMN availability TEXT NOT NULL DEFAULT ''")
+    rebuild_availability(conn)
+    cursor.executescript(AVAILABILITY_SCHEMA)
+
+def availability_mismatches(conn: sqlite3.Connection, chunk_size: int = 10000) -> Iterator[Tuple[int, str]]:
+    """Yield (movie_id, expected availability) for every movie whose column is stale"""
+    cursor = conn.cursor()
+    last_id = 0
+    while True:
+        cursor.execute(f"""
+            SELECT id, availability, {_NAMES.format(movie_id='m.id')}
+            FROM Movies m WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        for movie_id, stored, expected in rows:
+            if stored != expected:
+                yield movie_id, expected
+        last_id = rows[-1][0]
+
+def rebuild_availability(conn: sqlite3.Connection, chunk_size: int = 10000) -> int:
+    """Recompute every stale availability value; returns how many were fixed.
+
+    Fixes are written one chunk at a time, in the caller's transaction.
+    """
+    fixed = 0
+    pending = []
+    for movie_id, expected in availability_mismatches(conn, chunk_size):
+        pending.append((expected, movie_id))
+        if len(pending) >= chunk_size:
+            conn.executemany("UPDATE Movies SET availability = ? WHERE id = ?", pending)
+            fixed += len(pending)
+            pending = []
+    if pending:
+        conn.executemany("UPDATE Movies SET availability = ? WHERE id = ?", pending)
+        fixed += len(pending)
+    return fixed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check Movies.availability against Movie_Streamings")
+    parser.add_argument('--config', default='default', help="Config name used to locate the database")
+    parser.add_argument('--rebuild', action='store_true', help="Rewrite stale values instead of listing them")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app(args.config)
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        if args.rebuild:
+            with conn:
+                print(f"Rebuilt availability for {rebuild_availability(conn):,} movies")
+        else:
+            stale = [movie_id for movie_id, _ in availability_mismatches(conn)]
+            print(f"{len(stale):,} movies with stale availability" + (f": {stale[:20]}" if stale else ""))
+            raise SystemExit(1 if stale else 0)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
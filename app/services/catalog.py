@@ -0,0 +1,105 @@
+import sqlite3
+from typing import Optional
+
+# Bumped by triggers on every catalog write so in-process caches can tell
+# when Movies, Movie_Streamings or Streaming_Services changed underneath them
+CATALOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Catalog_Version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+
+    INSERT OR IGNORE INTO Catalog_Version (id, version) VALUES (1, 0);
+""" + "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS catalog_version_{table.lower()}_{event.lower()}
+    AFTER {event} ON {table} BEGIN
+        UPDATE Catalog_Version SET version = version + 1 WHERE id = 1;
+    END;
+""" for table in ('Movies', 'Movie_Streamings', 'Streaming_Services')
+    for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+# Per-movie versions take a fresh value of the global counter, so they stay
+# monotonic even when a deleted movie's id is reused
+_BUMP_MOVIE = """
+        UPDATE Catalog_Version SET version = version + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO Movie_Versions (movie_id, version)
+        SELECT {movie_id}, version FROM Catalog_Version WHERE id = 1;
+"""
+
+VERSION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Movie_Versions (
+        movie_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_movie_versions_version ON Movie_Versions (version);
+
+    CREATE TABLE IF NOT EXISTS Services_Version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+
+    INSERT OR IGNORE INTO Services_Version (id, version) VALUES (1, 0);
+""" + "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS movie_version_{table.lower()}_{event.lower()}
+    AFTER {event} ON {table} BEGIN{body}    END;
+""" for table, event, body in (
+    ('Movies', 'INSERT', _BUMP_MOVIE.format(movie_id='new.id')),
+    ('Movies', 'UPDATE', _BUMP_MOVIE.format(movie_id='new.id')),
+    ('Movies', 'DELETE', _BUMP_MOVIE.format(movie_id='old.id')),
+    ('Movie_Streamings', 'INSERT', _BUMP_MOVIE.format(movie_id='new.movie_id')),
+    ('Movie_Streamings', 'UPDATE', _BUMP_MOVIE.format(movie_id='old.movie_id')
+                                   + _BUMP_MOVIE.format(movie_id='new.movie_id')),
+    ('Movie_Streamings', 'DELETE', _BUMP_MOVIE.format(movie_id='old.movie_id')),
+)) + "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS services_version_{event.lower()}
+    AFTER {event} ON Streaming_Services BEGIN
+        UPDATE Services_Version SET version = version + 1 WHERE id = 1;
+    END;
+""" for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+def init_catalog(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Movie_Versions'")
+    exists = cursor.fetchone() is not None
+    cursor.executescript(CATALOG_SCHEMA + VERSION_SCHEMA)
+    if not exists:
+        touch_catalog(conn)
+
+def touch_catalog(conn: sqlite3.Connection):
+    """Bump every version at once, e.g. after a bulk load that bypassed the triggers"""
+    cursor = conn.cursor()
+    cursor.execute("UPDATE Catalog_Version SET version = version + 1 WHERE id = 1")
+    cursor.execute("""
+        INSERT OR REPLACE INTO Movie_Versions (movie_id, version)
+        SELECT m.id, v.version FROM Movies m, Catalog_Version v WHERE v.id = 1
+    """)
+    cursor.execute("UPDATE Services_Version SET version = version + 1 WHERE id = 1")
+
+def catalog_version(db: sqlite3.Connection) -> int:
+    cursor = db.cursor()
+    cursor.execute("SELECT version FROM Catalog_Version WHERE id = 1")
+    return cursor.fetchone()[0]
+
+def services_version(db: sqlite3.Connection) -> int:
+    cursor = db.cursor()
+    cursor.execute("SELECT version FROM Services_Version WHERE id = 1")
+    return cursor.fetchone()[0]
+
+def services_etag(db: sqlite3.Connection) -> str:
+    return f"services-{services_version(db)}"
+
+def movie_etag(db: sqlite3.Connection, movie_id: int) -> Optional[str]:
+    """ETag for a movie's payload, or None if the movie was never seen.
+
+    Service names are part of the payload, so renaming a service changes
+    every movie's tag as well.
+    """
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT mv.version, sv.version
+        FROM Movie_Versions mv, Services_Version sv
+        WHERE mv.movie_id = ? AND sv.id = 1
+    """, (movie_id,))
+    row = cursor.fetchone()
+    return f"movie-{movie_id}-{row[0]}-{row[1]}" if row else None
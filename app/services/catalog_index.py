@@ -0,0 +1,74 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+from app.services.catalog import catalog_version
+from app.services.database import get_db
+from app.services.snapshot import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+class CatalogIndex:
+    """Holds an in-memory index built from the catalog, such as the suggest index.
+
+    build(db) returns an index with a version attribute, the catalog version
+    it was built from. Once that version is behind, or max_age seconds have
+    passed, reads start one rebuild on a background thread and keep the
+    previous index until the new one is swapped in; only a read with no index
+    at all waits for a build. Next to a background catalog snapshot the first
+    build starts right away. With CATALOG_SNAPSHOT_REFRESH of 0, as in tests,
+    reads rebuild inline like the snapshot does.
+    """
+
+    def __init__(self, app, name: str, build: Callable[[sqlite3.Connection], Any],
+                 max_age: Optional[float] = None):
+        self.app = app
+        self.name = name
+        self.build = build
+        self.max_age = max_age
+        self.background = app.config['CATALOG_SNAPSHOT_REFRESH'] > 0
+        self.index = None
+        self.built_at = 0.0
+        self._build_lock = threading.Lock()
+        self._pending = threading.Lock()
+        if self.background and app.config['CATALOG_SNAPSHOT']:
+            self.refresh_async()
+
+    def current(self):
+        index = self.index
+        if index is not None and not self._stale(index):
+            return index
+        if index is None or not self.background:
+            with self._build_lock:
+                # Another read may have rebuilt it while this one waited
+                if self.index is index:
+                    self._rebuild(get_db())
+            return self.index
+        self.refresh_async()
+        return index
+
+    def refresh_async(self):
+        """Rebuild on a background thread unless a rebuild is already pending"""
+        if self._pending.acquire(blocking=False):
+            threading.Thread(target=self._run, name=self.name.replace(' ', '-'), daemon=True).start()
+
+    def _stale(self, index) -> bool:
+        snapshot = get_snapshot()
+        version = snapshot.version if snapshot is not None else catalog_version(get_db())
+        expired = self.max_age is not None and time.monotonic() - self.built_at >= self.max_age
+        return version != index.version or expired
+
+    def _rebuild(self, db: sqlite3.Connection):
+        started = time.monotonic()
+        self.index = self.build(db)
+        self.built_at = started
+
+    def _run(self):
+        try:
+            with self.app.app_context(), self._build_lock:
+                self._rebuild(get_db())
+        except sqlite3.Error as e:
+            logger.error(f"Error rebuilding {self.name}: {e}")
+        finally:
+            self._pending.release()
@@ -1,12 +1,172 @@
+import os
+import queue
 import sqlite3
+import threading
+from typing import Dict
+from urllib.request import pathname2url
 from flask import current_app, g
 from sqlite3 import Error
+from app.services.metrics import InstrumentedConnection, Metrics, get_metrics
+
+class PoolTimeout(Error):
+    """Raised when no pooled connection frees up within the checkout timeout"""
+
+class ConnectionPool:
+    """A bounded pool of long-lived SQLite connections for one process.
+
+    Connections are opened lazily up to size, configured once with the
+    pragmas below, and handed out most-recently-used first so hot
+    connections keep their page and statement caches warm.
+    """
+
+    def __init__(self, database: str, size: int = 8, timeout: float = 5.0,
+                 cached_statements: int = 256, pragmas: Dict[str, object] = None,
+                 metrics: Metrics = None):
+        self.database = database
+        self.metrics = metrics
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.pragmas = pragmas or {}
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=InstrumentedConnection if self.metrics else sqlite3.Connection
+        )
+        conn.row_factory = sqlite3.Row
+        if self.metrics:
+            conn.metrics = self.metrics
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            self._checkouts += 1
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            create = self._created < self.size
+            if create:
+                self._created += 1
+            else:
+                self._waits += 1
+
+        if create:
+            try:
+                return self._connect()
+            except Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed when released"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                "size": self.size,
+                "connections": self._created,
+                "idle": idle,
+                "in_use": self._created - idle,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+            }
+
+_pool_lock = threading.Lock()
+
+def database_uri(config, database: str = None) -> str:
+    """Return what to pass to sqlite3.connect(..., uri=True) for database, by default DATABASE.
+
+    With DB_READ_ONLY this is a mode=ro file: URI, so the connection can
+    never take a write lock; it still sees commits made by other processes.
+    """
+    database = database or config['DATABASE']
+    if not config['DB_READ_ONLY'] or database == ':memory:':
+        return database
+    return f"file:{pathname2url(os.path.abspath(database))}?mode=ro"
+
+def _create_pool(config, size: int = None, database: str = None) -> ConnectionPool:
+    database = database_uri(config, database)
+    pragmas = {
+        'busy_timeout': config['DB_BUSY_TIMEOUT_MS'],
+        'synchronous': config['DB_SYNCHRONOUS'],
+        'cache_size': config['DB_CACHE_SIZE'],
+        'mmap_size': config['DB_MMAP_SIZE'],
+    }
+    # Changing the journal mode needs a write; read-only connections use whatever is set
+    if database != ':memory:' and not config['DB_READ_ONLY']:
+        pragmas['journal_mode'] = config['DB_JOURNAL_MODE']
+    return ConnectionPool(
+        database,
+        size=size or config['DB_POOL_SIZE'],
+        timeout=config['DB_POOL_TIMEOUT'],
+        cached_statements=config['DB_CACHED_STATEMENTS'],
+        pragmas=pragmas,
+        metrics=get_metrics() if config['SQL_INSTRUMENTATION'] else None
+    )
+
+def get_pool() -> ConnectionPool:
+    pool = current_app.extensions.get('db_pool')
+    # Connections must not cross a fork, so a child process builds its own pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        pool = current_app.extensions.get('db_pool')
+        if pool is None or pool.pid != os.getpid():
+            pool = _create_pool(current_app.config)
+            current_app.extensions['db_pool'] = pool
+        return pool
+
+def close_pool(app):
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
 
 def get_db():
     if 'db' not in g:
         try:
-            g.db = sqlite3.connect(current_app.config['DATABASE'])
-            g.db.row_factory = sqlite3.Row
+            pool = get_pool()
+            g.db = pool.acquire()
+            g.db_pool = pool
         except Error as e:
             current_app.logger.error(f"Database connection error: {e}")
             return None
@@ -14,5 +174,6 @@ def get_db():
 
 def close_db(e=None):
     db = g.pop('db', None)
+    pool = g.pop('db_pool', None)
     if db is not None:
-        db.close() 
\ No newline at end of file
+        pool.release(db)
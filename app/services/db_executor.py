@@ -0,0 +1,102 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple, TypeVar
+from flask import Flask, current_app, g, has_request_context
+from app.services.database import _create_pool
+
+T = TypeVar('T')
+
+class DatabaseBusy(Exception):
+    """Raised when the executor already has max_in_flight calls queued or running"""
+
+class DatabaseExecutor:
+    """Run blocking database work for async views on a bounded thread pool.
+
+    Each worker thread checks out a connection from the executor's own pool,
+    so async requests never compete with sync views for connections. At most
+    max_in_flight calls may be queued or running at once; beyond that run()
+    raises DatabaseBusy instead of letting the queue grow without bound.
+    """
+
+    def __init__(self, app: Flask, workers: int = 8, max_in_flight: int = 64):
+        self.app = app
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.pid = os.getpid()
+        self.rejected = 0
+        self._pool = _create_pool(app.config, size=workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-executor')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _call(self, fn: Callable[..., T], args, kwargs) -> Tuple[T, int, float]:
+        # A fresh app context per call; its teardown returns the connection
+        with self.app.app_context():
+            g.db = self._pool.acquire()
+            g.db_pool = self._pool
+            g.sql_queries = 0
+            g.sql_seconds = 0.0
+            return fn(*args, **kwargs), g.sql_queries, g.sql_seconds
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise DatabaseBusy(f"{self._in_flight} database calls already in flight")
+            self._in_flight += 1
+        try:
+            result, queries, sql_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(self._call, fn, args, kwargs)
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        # The call ran outside the request context; charge its SQL to the request
+        if has_request_context():
+            g.sql_queries = g.get('sql_queries', 0) + queries
+            g.sql_seconds = g.get('sql_seconds', 0.0) + sql_seconds
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "rejected": self.rejected,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._pool.close()
+
+_executor_lock = threading.Lock()
+
+def get_db_executor() -> DatabaseExecutor:
+    executor = current_app.extensions.get('db_executor')
+    # Worker threads do not survive a fork, so a child process starts its own
+    if executor is not None and executor.pid == os.getpid():
+        return executor
+    with _executor_lock:
+        executor = current_app.extensions.get('db_executor')
+        if executor is None or executor.pid != os.getpid():
+            config = current_app.config
+            executor = DatabaseExecutor(
+                current_app._get_current_object(),
+                workers=config['ASYNC_DB_WORKERS'],
+                max_in_flight=config['ASYNC_DB_MAX_IN_FLIGHT']
+            )
+            current_app.extensions['db_executor'] = executor
+        return executor
+
+def close_db_executor(app: Flask):
+    executor = app.extensions.pop('db_executor', None)
+    if executor is not None and executor.pid == os.getpid():
+        executor.close()
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Await fn(*args, **kwargs) on the app's database executor"""
+    return await get_db_executor().run(fn, *args, **kwargs)
@@ -0,0 +1,175 @@
+import heapq
+from itertools import product
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+from flask import current_app
+from app.services.catalog import catalog_version
+from app.services.catalog_index import CatalogIndex
+from app.services.snapshot import get_snapshot
+from app.services.suggest import normalize_title
+
+def trigrams(normalized: str) -> List[str]:
+    """Distinct trigrams of each word padded like pg_trgm: two spaces before, one after"""
+    grams = {}
+    for word in normalized.split():
+        padded = f"  {word} "
+        for start in range(len(padded) - 2):
+            grams[padded[start:start + 3]] = None
+    return list(grams)
+
+def max_edits(normalized: str) -> int:
+    """Edits a query of this length tolerates: one per four characters, at least one"""
+    return max(1, len(normalized) // 4)
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between a and b.
+
+    Myers' bit-parallel algorithm: each character of b costs a few integer
+    operations whatever the length of a.
+    """
+    m = len(a)
+    if not m:
+        return len(b)
+    peq = defaultdict(int)
+    for i, char in enumerate(a):
+        peq[char] |= 1 << i
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv = mask, 0
+    score = m
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+class TrigramIndex:
+    """Typo-tolerant title lookup through a trigram index over title words.
+
+    Trigrams index the distinct words of the catalog, which are far fewer
+    than titles. A word within d edits of a query word keeps all but 3d of
+    its trigrams, so candidates need that many in common; any such word
+    appears in one of the query word's rarest trigram lists, so only those
+    are scanned. The best-overlapping candidates are re-ranked by edit
+    distance, and titles containing a close word for every query word are
+    ranked by their total distance.
+
+    Titles are numbered in title order, so ordering results is an integer
+    sort over those ranks.
+    """
+
+    def __init__(self, titles: Iterable[Tuple[int, str]], version: int):
+        self.version = version
+        ordered = sorted((normalize_title(title), movie_id) for movie_id, title in titles)
+        self.movie_ids = array('q', (movie_id for _, movie_id in ordered))
+        self.words: List[str] = []
+        word_ids: Dict[str, int] = {}
+        ranks = defaultdict(list)
+        for rank, (normalized, _) in enumerate(ordered):
+            for word in set(normalized.split()):
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = word_ids[word] = len(self.words)
+                    self.words.append(word)
+                ranks[word_id].append(rank)
+        self.word_ranks: List[array] = [array('q', ranks[word_id]) for word_id in range(len(self.words))]
+
+        postings = defaultdict(list)
+        for word_id, word in enumerate(self.words):
+            for gram in trigrams(word):
+                postings[gram].append(word_id)
+        self.postings: Dict[str, array] = {gram: array('q', ids) for gram, ids in postings.items()}
+
+    def similar_words(self, word: str, candidates: int = 200) -> Dict[int, int]:
+        """Map ids of words within max_edits(word) of word to their distance"""
+        grams = trigrams(word)
+        edits = max_edits(word)
+        required = max(1, len(grams) - 3 * edits)
+
+        lists = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        scanned = len(lists) - required + 1
+        counts = Counter()
+        for ids in lists[:scanned]:
+            counts.update(ids)
+        for ids in lists[scanned:]:
+            for word_id, count in counts.items():
+                position = bisect_left(ids, word_id)
+                if position < len(ids) and ids[position] == word_id:
+                    counts[word_id] = count + 1
+
+        shortlist = heapq.nlargest(
+            candidates, (word_id for word_id, count in counts.items() if count >= required),
+            key=counts.__getitem__
+        )
+        matches = {}
+        for word_id in shortlist:
+            other = self.words[word_id]
+            if abs(len(other) - len(word)) <= edits:
+                distance = edit_distance(word, other)
+                if distance <= edits:
+                    matches[word_id] = distance
+        return matches
+
+    def search(self, query: str, limit: int = 20, candidates: int = 200) -> List[Tuple[int, int]]:
+        """Return up to limit (movie_id, distance) pairs, closest first, then by title"""
+        words = list(dict.fromkeys(normalize_title(query).split()))
+        if not words:
+            return []
+
+        # Per query word, the title ranks at each distance, keeping each title's closest match
+        per_word = []
+        for word in words:
+            matches = self.similar_words(word, candidates)
+            if not matches:
+                return []
+            levels = defaultdict(set)
+            for word_id, distance in matches.items():
+                levels[distance].update(self.word_ranks[word_id])
+            seen = set()
+            for distance in sorted(levels):
+                levels[distance] -= seen
+                seen |= levels[distance]
+            per_word.append(sorted(levels.items()))
+
+        # Few distances per word, so every combination of them is cheap to intersect
+        buckets = defaultdict(set)
+        for combination in product(*per_word):
+            sets = sorted((ranks for _, ranks in combination), key=len)
+            buckets[sum(distance for distance, _ in combination)] |= sets[0].intersection(*sets[1:])
+
+        results = []
+        for distance in sorted(buckets):
+            for rank in heapq.nsmallest(limit - len(results), buckets[distance]):
+                results.append((self.movie_ids[rank], distance))
+            if len(results) >= limit:
+                break
+        return results
+
+def _build_index(db) -> TrigramIndex:
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return TrigramIndex(((record.id, record.title) for record in snapshot.movies.values()),
+                            snapshot.version)
+    cursor = db.cursor()
+    version = catalog_version(db)
+    cursor.execute("SELECT id, title FROM Movies")
+    return TrigramIndex(((row[0], row[1]) for row in cursor.fetchall()), version)
+
+def init_trigram_index(app):
+    """Rebuild the trigram index after catalog changes"""
+    app.extensions['trigram_index'] = CatalogIndex(app, 'trigram index', _build_index)
+
+def get_trigram_index() -> TrigramIndex:
+    return current_app.extensions['trigram_index'].current()
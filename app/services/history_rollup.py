@@ -0,0 +1,121 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from app.services.history_shards import shard_paths
+
+logger = logging.getLogger(__name__)
+
+_DAY = "(CAST(strftime('%s', COALESCE(search_timestamp, CURRENT_TIMESTAMP)) AS INTEGER) / 86400)"
+
+def _cutoff(retention_hours: float) -> str:
+    # Same format as the stored timestamps, so they compare as strings
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - retention_hours * 3600))
+
+def compact_batch(conn: sqlite3.Connection, cutoff: str, batch_size: int = 5000) -> int:
+    """Roll up and delete the next run of history rows older than cutoff, in one transaction.
+
+    Rows are taken in id order up to the first one that is still recent, so
+    everything at or below the History_Rollup watermark has been rolled up.
+    Returns the number of rows compacted.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("SELECT rolled_through FROM History_Rollup")
+        start = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT id, COALESCE(search_timestamp, '') < ? FROM Movie_Search_History
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (cutoff, start, batch_size))
+        end = start
+        for row_id, expired in cursor.fetchall():
+            if not expired:
+                break
+            end = row_id
+        if end == start:
+            conn.rollback()
+            return 0
+
+        cursor.execute(f"""
+            INSERT INTO Search_History_Daily (day, movie_id, count)
+            SELECT {_DAY} AS day, movie_id, COUNT(*) FROM Movie_Search_History
+            WHERE id > ? AND id <= ?
+            GROUP BY day, movie_id
+            ON CONFLICT (day, movie_id) DO UPDATE SET count = count + excluded.count
+        """, (start, end))
+        # Move the watermark first: the delete triggers skip rows at or below it
+        cursor.execute("UPDATE History_Rollup SET rolled_through = ?", (end,))
+        cursor.execute("DELETE FROM Movie_Search_History WHERE id > ? AND id <= ?", (start, end))
+        compacted = cursor.rowcount
+        conn.commit()
+        return compacted
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+def compact_history(conn: sqlite3.Connection, retention_hours: float, batch_size: int = 5000,
+                    stopped: Optional[threading.Event] = None) -> int:
+    """Compact every history row older than retention_hours, batch_size rows per transaction.
+
+    Returns the number of rows compacted.
+    """
+    cutoff = _cutoff(retention_hours)
+    total = 0
+    while stopped is None or not stopped.is_set():
+        compacted = compact_batch(conn, cutoff, batch_size)
+        total += compacted
+        if not compacted:
+            break
+    return total
+
+class HistoryCompactor:
+    """Compact search history in each of databases from a background thread every interval seconds"""
+
+    def __init__(self, databases: List[str], retention_hours: float, interval: float, batch_size: int = 5000):
+        self.databases = databases
+        self.retention_hours = retention_hours
+        self.interval = interval
+        self.batch_size = batch_size
+        self.compacted = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='history-compactor', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        conns = [sqlite3.connect(database) for database in self.databases]
+        try:
+            while not self._stopped.is_set():
+                for conn in conns:
+                    try:
+                        self.compacted += compact_history(
+                            conn, self.retention_hours, self.batch_size, self._stopped
+                        )
+                    except sqlite3.Error as e:
+                        logger.error(f"Error compacting search history: {e}")
+                self._stopped.wait(self.interval)
+        finally:
+            for conn in conns:
+                conn.close()
+
+def init_history_compactor(app):
+    config = app.config
+    if config['HISTORY_RETENTION_HOURS'] and config['HISTORY_COMPACT_INTERVAL'] > 0:
+        app.extensions['history_compactor'] = HistoryCompactor(
+            shard_paths(config) or [config['DATABASE']],
+            config['HISTORY_RETENTION_HOURS'],
+            config['HISTORY_COMPACT_INTERVAL'],
+            config['HISTORY_COMPACT_BATCH']
+        )
+
+def close_history_compactor(app):
+    compactor = app.extensions.pop('history_compactor', None)
+    if compactor is not None:
+        compactor.close()
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from flask import current_app
+from app.services.database import ConnectionPool, _create_pool, database_uri, get_db
+from app.services.migrations import SHARD_MIGRATIONS, SHARD_SCHEMA_VERSION, migrate, schema_version
+from app.services.trending import align_decay, init_decay, refresh_windows, top_movies
+
+def shard_paths(config) -> List[str]:
+    """History shard files next to DATABASE, or none when HISTORY_SHARDS is 0"""
+    shards = config['HISTORY_SHARDS']
+    if not shards or config['DATABASE'] == ':memory:':
+        return []
+    root, extension = os.path.splitext(config['DATABASE'])
+    return [f"{root}-history{number}{extension or '.db'}" for number in range(shards)]
+
+def partition(rows: Sequence[Tuple], shards: int) -> Dict[int, List[Tuple]]:
+    """Group rows whose first field is a movie id by the shard holding that movie.
+
+    Each movie's history lives in a single shard, so its counters are never
+    split and per-shard rankings merge exactly.
+    """
+    parts = defaultdict(list)
+    for row in rows:
+        parts[row[0] % shards].append(row)
+    return parts
+
+def init_shards():
+    """Bring every history shard's schema up to date, as init_db does for the catalog"""
+    config = current_app.config
+    conns = []
+    try:
+        for path in shard_paths(config):
+            conn = sqlite3.connect(database_uri(config, path), uri=True)
+            conns.append(conn)
+            if schema_version(conn) < SHARD_SCHEMA_VERSION:
+                conn.execute(f"PRAGMA journal_mode = {config['DB_JOURNAL_MODE']}")
+                migrate(conn, SHARD_MIGRATIONS)
+            init_decay(conn, config['TRENDING_HALF_LIFE_HOURS'])
+            if conn.in_transaction:
+                conn.commit()
+        if conns and current_app.extensions.get('trending_decay') and not config['DB_READ_ONLY']:
+            align_decay(conns)
+    finally:
+        for conn in conns:
+            conn.close()
+
+_pools_lock = threading.Lock()
+
+def get_shard_pools() -> List[ConnectionPool]:
+    """One connection pool per history shard, empty when history is not sharded"""
+    pools = current_app.extensions.get('history_shard_pools')
+    # Like the catalog pool, shard pools are rebuilt in a forked child
+    if pools is not None and (not pools or pools[0].pid == os.getpid()):
+        return pools
+    with _pools_lock:
+        pools = current_app.extensions.get('history_shard_pools')
+        if pools is None or (pools and pools[0].pid != os.getpid()):
+            config = current_app.config
+            pools = [_create_pool(config, database=path) for path in shard_paths(config)]
+            current_app.extensions['history_shard_pools'] = pools
+        return pools
+
+def close_history_shards(app):
+    pools = app.extensions.pop('history_shard_pools', None) or []
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+@contextmanager
+def shard_connection(number: int) -> Iterator[sqlite3.Connection]:
+    pool = get_shard_pools()[number]
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+def write_history(rows: List[Tuple[int, str]], insert_sql: str) -> bool:
+    """Write (movie_id, timestamp) rows to their shards, one transaction per shard.
+
+    Returns False when history is not sharded and nothing was written.
+    """
+    pools = get_shard_pools()
+    if not pools:
+        return False
+    for number, part in partition(rows, len(pools)).items():
+        with shard_connection(number) as conn:
+            conn.executemany(insert_sql, part)
+            conn.commit()
+    return True
+
+def trending_rows(db: sqlite3.Connection, window: str, limit: int,
+                  after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float, float]]:
+    """top_movies over the catalog database, or merged across history shards.
+
+    Every shard returns its own best limit rows after the same keyset; as a
+    movie's counts live in one shard, the best limit of their union is the
+    global page.
+    """
+    pools = get_shard_pools()
+    if not pools:
+        return top_movies(db, window, limit, after)
+    ranked = {}
+    for number in range(len(pools)):
+        with shard_connection(number) as conn:
+            for row in top_movies(conn, window, limit, after, shard=number):
+                # A movie can only repeat if HISTORY_SHARDS changed; keep its best row
+                if row[0] not in ranked or row[2] > ranked[row[0]][2]:
+                    ranked[row[0]] = row
+    return sorted(ranked.values(), key=lambda row: (-row[2], row[0]))[:limit]
+
+def all_time_counts(db: sqlite3.Connection) -> Dict[int, float]:
+    """All-time search counts per movie, from the catalog database or every shard"""
+    query = "SELECT movie_id, score FROM Trending_Counters WHERE window_name = 'all'"
+    pools = get_shard_pools()
+    if not pools:
+        return {row[0]: row[1] for row in db.execute(query)}
+    counts = defaultdict(float)
+    for number in range(len(pools)):
+        with shard_connection(number) as conn:
+            for movie_id, score in conn.execute(query):
+                counts[movie_id] += score
+    return counts
+
+def refresh_trending():
+    """Expire trending windows in the catalog database or in every history shard"""
+    pools = get_shard_pools()
+    if not pools:
+        refresh_windows(get_db())
+    for number in range(len(pools)):
+        with shard_connection(number) as conn:
+            refresh_windows(conn, shard=number)
@@ -0,0 +1,183 @@
+import atexit
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Sequence, Tuple
+from flask import current_app
+from app.services.database import get_db
+from app.services.history_shards import partition, shard_paths, write_history
+
+logger = logging.getLogger(__name__)
+
+INSERT_HISTORY = "INSERT INTO Movie_Search_History (movie_id, search_timestamp) VALUES (?, ?)"
+
+_writer_lock = threading.Lock()
+
+def _timestamp() -> str:
+    # Same format as SQLite's CURRENT_TIMESTAMP so enqueued rows sort with direct inserts
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+class HistoryWriter:
+    """Drain search-history rows to SQLite from a background thread.
+
+    Rows are queued in memory and written in batched executemany transactions
+    once batch_size rows are pending or flush_interval seconds have passed.
+    When the queue is more than half full the 'sample' policy keeps only a
+    sample_rate fraction of new rows; a full queue always drops. With shards,
+    rows go to those files instead of database, partitioned by movie id.
+    """
+
+    def __init__(self, database: str, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_queue: int = 10000, overflow_policy: str = 'drop', sample_rate: float = 0.1,
+                 shards: Sequence[str] = ()):
+        if overflow_policy not in ('drop', 'sample'):
+            raise ValueError(f"Unknown history overflow policy: {overflow_policy}")
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+        self.shards = list(shards)
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, movie_ids: Iterable[int], timestamp: str = None):
+        if self._stopped.is_set():
+            return
+        timestamp = timestamp or _timestamp()
+        for movie_id in movie_ids:
+            if (self.overflow_policy == 'sample'
+                    and self._queue.qsize() * 2 >= self.max_queue
+                    and random.random() >= self.sample_rate):
+                self.dropped += 1
+                continue
+            try:
+                self._queue.put_nowait((movie_id, timestamp))
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        self._queue.join()
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        conns = [sqlite3.connect(path) for path in self.shards or [self.database]]
+        try:
+            while True:
+                batch = self._collect()
+                if batch:
+                    self._write(conns, batch)
+                elif self._stopped.is_set():
+                    return
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def _collect(self) -> List[Tuple[int, str]]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+            except queue.Empty:
+                if self._stopped.is_set():
+                    break
+        return batch
+
+    def _write(self, conns: List[sqlite3.Connection], batch: List[Tuple[int, str]]):
+        try:
+            for number, rows in partition(batch, len(conns)).items():
+                try:
+                    with conns[number]:
+                        conns[number].executemany(INSERT_HISTORY, rows)
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    self.dropped += len(rows)
+                    logger.error(f"Error writing search history: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+class HistoryChannel:
+    """Forward search-history rows to the one writer process of a prefork server.
+
+    Stands in for a HistoryWriter in read-only workers: each search becomes
+    one message on a multiprocessing queue, timestamped here. Messages that
+    do not fit in the queue are dropped. written counts rows handed over.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.dropped = 0
+        self.written = 0
+
+    def record(self, movie_ids: Iterable[int]):
+        movie_ids = list(movie_ids)
+        try:
+            self.channel.put_nowait((_timestamp(), movie_ids))
+            self.written += len(movie_ids)
+        except queue.Full:
+            self.dropped += len(movie_ids)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Wait until queued messages have reached the pipe"""
+        self.channel.close()
+        self.channel.join_thread()
+
+def get_history_writer() -> HistoryWriter:
+    writer = current_app.extensions.get('history_writer')
+    if writer is not None:
+        return writer
+    with _writer_lock:
+        writer = current_app.extensions.get('history_writer')
+        if writer is not None:
+            return writer
+        config = current_app.config
+        writer = HistoryWriter(
+            config['DATABASE'],
+            batch_size=config['HISTORY_BATCH_SIZE'],
+            flush_interval=config['HISTORY_FLUSH_INTERVAL'],
+            max_queue=config['HISTORY_QUEUE_SIZE'],
+            overflow_policy=config['HISTORY_OVERFLOW_POLICY'],
+            sample_rate=config['HISTORY_SAMPLE_RATE'],
+            shards=shard_paths(config)
+        )
+        current_app.extensions['history_writer'] = writer
+        return writer
+
+def record_searches(movie_ids: List[int]):
+    """Record one search-history row per movie id"""
+    if not movie_ids:
+        return
+    if current_app.config['HISTORY_ASYNC']:
+        get_history_writer().record(movie_ids)
+        return
+
+    timestamp = _timestamp()
+    rows = [(movie_id, timestamp) for movie_id in movie_ids]
+    if not write_history(rows, INSERT_HISTORY):
+        db = get_db()
+        db.executemany(INSERT_HISTORY, rows)
+        db.commit()
@@ -0,0 +1,210 @@
+"""Streaming bulk loader for the movie catalog.
+
+Loads movies, streaming services and availability from CSV or JSONL files in
+fixed-size chunks, resolving relations by natural key through in-memory id
+maps. Secondary indexes and catalog triggers are dropped for the duration of
+the load and recreated once at the end from the schema definitions, also when
+the load fails. Loads are idempotent, and each run first restores anything a
+killed run left dropped, so an interrupted run can simply be repeated.
+
+    python -m app.services.ingest --movies movies.csv --services services.csv \\
+        --availability availability.jsonl
+
+Files need the columns title and release_year (movies), service_name
+(services), and title, release_year and service_name (availability).
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from app.services.availability import AVAILABILITY_SCHEMA, rebuild_availability
+from app.services.catalog import CATALOG_SCHEMA, VERSION_SCHEMA, touch_catalog
+from app.services.migrations import SECONDARY_INDEXES
+from app.services.search_index import FTS_SCHEMA, has_fts
+
+CATALOG_TABLES = ('Movies', 'Streaming_Services', 'Movie_Streamings')
+
+def read_rows(path: str) -> Iterator[Dict]:
+    """Stream rows from a .csv or .jsonl/.ndjson file as dicts"""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    elif path.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
+
+def chunked(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def restore_catalog_objects(conn: sqlite3.Connection):
+    """Recreate the indexes and triggers on the catalog tables from their schema.
+
+    Every statement is CREATE ... IF NOT EXISTS, so this only fills in what
+    is missing; optional features are restored where the database has them.
+    """
+    conn.executescript(SECONDARY_INDEXES)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'Catalog_Version'").fetchone():
+        conn.executescript(CATALOG_SCHEMA + VERSION_SCHEMA)
+    if has_fts(conn):
+        conn.executescript(FTS_SCHEMA)
+    if 'availability' in {row[1] for row in conn.execute("PRAGMA table_info(Movies)")}:
+        conn.executescript(AVAILABILITY_SCHEMA)
+
+class CatalogLoader:
+    """Bulk-load catalog rows into an open connection.
+
+    Use as a context manager: entering defers indexes and triggers on the
+    catalog tables, leaving restores them and rebuilds derived data.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, chunk_size: int = 50000,
+                 report: Callable[[str], None] = print):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.report = report
+        self.movie_ids: Dict[Tuple[str, int], int] = {}
+        self.service_ids: Dict[str, int] = {}
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, title, release_year FROM Movies")
+        self.movie_ids = {(title, year): movie_id for movie_id, title, year in cursor}
+        cursor.execute("SELECT id, service_name FROM Streaming_Services")
+        self.service_ids = {name: service_id for service_id, name in cursor}
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM Movies")
+        self._next_movie_id = cursor.fetchone()[0] + 1
+
+    def __enter__(self) -> 'CatalogLoader':
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.execute("PRAGMA cache_size = -262144")
+        # A killed run leaves its objects dropped; restore them so this one drops the full set
+        restore_catalog_objects(self.conn)
+
+        placeholders = ", ".join("?" * len(CATALOG_TABLES))
+        cursor.execute(f"""
+            SELECT type, name FROM sqlite_master
+            WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+        """, CATALOG_TABLES)
+        for object_type, name in cursor.fetchall():
+            cursor.execute(f"DROP {object_type.upper()} {name}")
+        self.conn.commit()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        cursor = self.conn.cursor()
+        started = time.perf_counter()
+        # Before the triggers return, so fixing each row does not bump its version too
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(Movies)")}
+        if 'availability' in columns:
+            rebuild_availability(self.conn)
+        restore_catalog_objects(self.conn)
+        cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('Movies_FTS', 'Movie_Versions')")
+        derived = {row[0] for row in cursor.fetchall()}
+        if 'Movies_FTS' in derived:
+            cursor.execute("INSERT INTO Movies_FTS (Movies_FTS) VALUES ('rebuild')")
+        if 'Movie_Versions' in derived:
+            touch_catalog(self.conn)
+        self.conn.commit()
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        self.report(f"Rebuilt indexes and triggers in {time.perf_counter() - started:.1f}s")
+        return False
+
+    def _load(self, label: str, rows: Iterable[Dict], load_chunk: Callable[[List[Dict]], int]) -> int:
+        started = time.perf_counter()
+        total = 0
+        for chunk in chunked(rows, self.chunk_size):
+            with self.conn:
+                total += load_chunk(chunk)
+            elapsed = time.perf_counter() - started
+            self.report(f"{label}: {total:,} rows ({total / elapsed if elapsed else 0:,.0f} rows/sec)")
+        elapsed = time.perf_counter() - started
+        self.report(f"{label}: loaded {total:,} rows in {elapsed:.1f}s")
+        return total
+
+    def load_movies(self, rows: Iterable[Dict]) -> int:
+        def load_chunk(chunk):
+            new_rows = []
+            for row in chunk:
+                key = (row['title'], int(row['release_year']))
+                if key not in self.movie_ids:
+                    self.movie_ids[key] = self._next_movie_id
+                    new_rows.append((self._next_movie_id, key[0], key[1]))
+                    self._next_movie_id += 1
+            self.conn.executemany(
+                "INSERT INTO Movies (id, title, release_year) VALUES (?, ?, ?)", new_rows
+            )
+            return len(new_rows)
+        return self._load('Movies', rows, load_chunk)
+
+    def load_services(self, rows: Iterable[Dict]) -> int:
+        def load_chunk(chunk):
+            loaded = 0
+            for row in chunk:
+                name = row['service_name']
+                if name not in self.service_ids:
+                    cursor = self.conn.execute(
+                        "INSERT INTO Streaming_Services (service_name) VALUES (?)", (name,)
+                    )
+                    self.service_ids[name] = cursor.lastrowid
+                    loaded += 1
+            return loaded
+        return self._load('Streaming_Services', rows, load_chunk)
+
+    def load_availability(self, rows: Iterable[Dict]) -> int:
+        def load_chunk(chunk):
+            pairs = []
+            skipped = 0
+            for row in chunk:
+                movie_id = self.movie_ids.get((row['title'], int(row['release_year'])))
+                service_id = self.service_ids.get(row['service_name'])
+                if movie_id is None or service_id is None:
+                    skipped += 1
+                    continue
+                pairs.append((movie_id, service_id))
+            if skipped:
+                self.report(f"Movie_Streamings: skipped {skipped} rows with unknown movie or service")
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO Movie_Streamings (movie_id, service_id) VALUES (?, ?)", pairs
+            )
+            return cursor.rowcount
+        return self._load('Movie_Streamings', rows, load_chunk)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load catalog files into the movie database")
+    parser.add_argument('--config', default='default', help="Config name used to locate the database")
+    parser.add_argument('--movies', help="CSV/JSONL file with title, release_year")
+    parser.add_argument('--services', help="CSV/JSONL file with service_name")
+    parser.add_argument('--availability', help="CSV/JSONL file with title, release_year, service_name")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Rows per transaction")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app(args.config)  # Creates any missing tables
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        with CatalogLoader(conn, chunk_size=args.chunk_size) as loader:
+            if args.movies:
+                loader.load_movies(read_rows(args.movies))
+            if args.services:
+                loader.load_services(read_rows(args.services))
+            if args.availability:
+                loader.load_availability(read_rows(args.availability))
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
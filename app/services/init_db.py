@@ -1,46 +1,29 @@
 import sqlite3
 from flask import current_app
+from app.services.database import database_uri
+from app.services.history_shards import init_shards
+from app.services.migrations import SCHEMA_VERSION, migrate, schema_version
+from app.services.search_index import has_fts
+from app.services.trending import init_decay
 
 def init_db():
-    """Initialize the database with required tables"""
-    conn = sqlite3.connect(current_app.config['DATABASE'])
-    cursor = conn.cursor()
-    
-    cursor.executescript("""
-        CREATE TABLE IF NOT EXISTS Movies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            release_year INTEGER NOT NULL
-        );
-        
-        CREATE TABLE IF NOT EXISTS Streaming_Services (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            service_name TEXT NOT NULL UNIQUE
-        );
-        
-        CREATE TABLE IF NOT EXISTS Movie_Streamings (
-            movie_id INTEGER,
-            service_id INTEGER,
-            PRIMARY KEY (movie_id, service_id),
-            FOREIGN KEY (movie_id) REFERENCES Movies(id),
-            FOREIGN KEY (service_id) REFERENCES Streaming_Services(id)
-        );
+    """Bring the database schema up to date and detect optional SQLite features.
 
-        CREATE TABLE IF NOT EXISTS Movie_Search_History (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            movie_id INTEGER NOT NULL,
-            search_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (movie_id) REFERENCES Movies(id)
-        );
+    The schema version lives in the database header, so an up-to-date
+    database costs a handful of reads here and no write lock. With
+    DB_READ_ONLY the schema must already be current.
+    """
+    conn = sqlite3.connect(database_uri(current_app.config), uri=True)
+    try:
+        if schema_version(conn) < SCHEMA_VERSION:
+            migrate(conn)
 
-        -- Insert default streaming services if they don't exist
-        INSERT OR IGNORE INTO Streaming_Services (service_name) VALUES
-            ('Netflix'),
-            ('Amazon Prime'),
-            ('Disney+'),
-            ('Hulu'),
-            ('HBO Max');
-    """)
-    
-    conn.commit()
-    conn.close() 
\ No newline at end of file
+        current_app.extensions['fts5'] = has_fts(conn)
+        current_app.extensions['trending_decay'] = init_decay(
+            conn, current_app.config['TRENDING_HALF_LIFE_HOURS']
+        )
+        if conn.in_transaction:
+            conn.commit()
+    finally:
+        conn.close()
+    init_shards()
@@ -0,0 +1,82 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from flask import Response, current_app
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder produces equivalent JSON
+    orjson = None
+
+def dumps(obj) -> bytes:
+    """Encode obj as compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def splice_results(fragments: Iterable[bytes], fields: Dict) -> bytes:
+    """Encode {"results": [...], **fields} with already encoded result fragments spliced in"""
+    head = b'{"results":[' + b','.join(fragments)
+    # Reuse dumps for the trailing fields, minus its opening brace
+    return head + (b'],' + dumps(fields)[1:] if fields else b']}')
+
+def json_response(body: bytes, status: int = 200) -> Response:
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+class FragmentCache:
+    """LRU cache of encoded movie payloads, each tagged with the version it encodes.
+
+    Entries are per movie rather than per catalog version, so a write to
+    one movie only re-encodes that movie; a lookup with a newer version
+    misses and the next put replaces the stale entry.
+    """
+
+    def __init__(self, max_size: int = 50000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, lookups: Iterable[Tuple[Hashable, Hashable]]) -> List[Optional[bytes]]:
+        """Fragments for (key, version) pairs, None where missing or stale, under one lock"""
+        fragments = []
+        with self._lock:
+            for key, version in lookups:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] != version:
+                    self.misses += 1
+                    fragments.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                fragments.append(entry[1])
+        return fragments
+
+    def put_many(self, entries: Iterable[Tuple[Hashable, Hashable, bytes]]):
+        with self._lock:
+            for key, version, fragment in entries:
+                self._entries[key] = (version, fragment)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+def get_fragment_cache() -> Optional[FragmentCache]:
+    """Return this app's fragment cache, or None when JSON_FRAGMENT_CACHE_SIZE is 0"""
+    if not current_app.config['JSON_FRAGMENT_CACHE_SIZE']:
+        return None
+    cache = current_app.extensions.get('json_fragments')
+    if cache is None:
+        cache = current_app.extensions.setdefault('json_fragments', FragmentCache(
+            max_size=current_app.config['JSON_FRAGMENT_CACHE_SIZE']
+        ))
+    return cache
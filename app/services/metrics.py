@@ -0,0 +1,189 @@
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from flask import current_app, g, has_app_context, request
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+def normalize_statement(sql: str) -> str:
+    """Collapse whitespace and variable-length IN (?, ?, ...) lists so statements group"""
+    sql = _WHITESPACE_RE.sub(' ', sql).strip()
+    return _PLACEHOLDER_LIST_RE.sub('(?...)', sql)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class Metrics:
+    """In-process counters and histograms exported in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.latency = defaultdict(Histogram)
+        self.request_queries = defaultdict(Histogram)
+        self.request_sql_seconds = defaultdict(Histogram)
+        self.statements = defaultdict(lambda: [0, 0.0])
+
+    def record_statement(self, sql: str, seconds: float, count: int = 1):
+        key = normalize_statement(sql)
+        with self._lock:
+            entry = self.statements[key]
+            entry[0] += count
+            entry[1] += seconds
+
+    def record_request(self, endpoint: str, status: int, seconds: float, queries: int, sql_seconds: float):
+        with self._lock:
+            self.requests[(endpoint, status)] += 1
+            self.latency[endpoint].observe(seconds)
+            self.request_queries[endpoint].observe(queries)
+            self.request_sql_seconds[endpoint].observe(sql_seconds)
+
+    def render(self, gauges: Dict[str, Dict[str, float]] = None) -> str:
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# TYPE movieapp_http_requests_total counter")
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'movieapp_http_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+
+            _render_histograms(lines, "movieapp_http_request_duration_seconds", self.latency)
+            _render_summary(lines, "movieapp_request_sql_queries", self.request_queries)
+            _render_summary(lines, "movieapp_request_sql_seconds", self.request_sql_seconds)
+
+            lines.append("# TYPE movieapp_sql_statements_total counter")
+            lines.append("# TYPE movieapp_sql_statement_seconds_total counter")
+            for sql, (count, seconds) in sorted(self.statements.items()):
+                label = f'statement="{_escape(sql)}"'
+                lines.append(f"movieapp_sql_statements_total{{{label}}} {count}")
+                lines.append(f"movieapp_sql_statement_seconds_total{{{label}}} {seconds:.6f}")
+
+        for name, values in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE movieapp_{name} gauge")
+            for key, value in sorted(values.items()):
+                lines.append(f'movieapp_{name}{{name="{_escape(key)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _render_histograms(lines: List[str], name: str, histograms: Dict[str, Histogram]):
+    lines.append(f"# TYPE {name} histogram")
+    for endpoint, histogram in sorted(histograms.items()):
+        label = f'endpoint="{_escape(endpoint)}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{label}}} {histogram.total:.6f}")
+        lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+def _render_summary(lines: List[str], name: str, histograms: Dict[str, Histogram]):
+    lines.append(f"# TYPE {name} summary")
+    for endpoint, histogram in sorted(histograms.items()):
+        label = f'endpoint="{_escape(endpoint)}"'
+        lines.append(f"{name}_sum{{{label}}} {histogram.total:.6f}")
+        lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+def _record_sql(metrics: Metrics, sql: str, seconds: float, count: int = 1):
+    metrics.record_statement(sql, seconds, count)
+    # Set per request by init_metrics, and per call by the database executor
+    if has_app_context() and 'sql_queries' in g:
+        g.sql_queries = g.get('sql_queries', 0) + count
+        g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execute and fetch calls against its connection's metrics"""
+
+    def _timed(self, method, sql, *args):
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            self._last_sql = sql
+            _record_sql(self.connection.metrics, sql, time.perf_counter() - started)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def _fetch(self, method, *args):
+        # Rows are produced lazily, so fetch time belongs to the statement too
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _record_sql(self.connection.metrics, getattr(self, '_last_sql', ''),
+                        time.perf_counter() - started, count=0)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+class InstrumentedConnection(sqlite3.Connection):
+    metrics: Metrics = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def get_metrics() -> Metrics:
+    metrics = current_app.extensions.get('metrics')
+    if metrics is None:
+        metrics = current_app.extensions.setdefault('metrics', Metrics())
+    return metrics
+
+def init_metrics(app):
+    """Time every request and optionally report it in a Server-Timing header"""
+    app.extensions['metrics'] = Metrics()
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        seconds = time.perf_counter() - started
+        queries = g.get('sql_queries', 0)
+        sql_seconds = g.get('sql_seconds', 0.0)
+        app.extensions['metrics'].record_request(
+            request.endpoint or 'unmatched', response.status_code, seconds, queries, sql_seconds
+        )
+        if app.config['SERVER_TIMING']:
+            response.headers['Server-Timing'] = (
+                f'db;dur={sql_seconds * 1000:.3f};desc="{queries} queries", '
+                f'app;dur={seconds * 1000:.3f}'
+            )
+        return response
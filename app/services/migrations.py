@@ -0,0 +1,115 @@
+"""Ordered schema migrations, tracked in PRAGMA user_version.
+
+Migration n (1-based position in MIGRATIONS) has been applied when
+user_version >= n. Every migration is idempotent, so databases created
+before versioning, or a run interrupted between a migration and its
+version bump, simply re-apply it.
+
+History shard files (HISTORY_SHARDS) hold only search history and its
+trending counters, and follow their own list, SHARD_MIGRATIONS.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+from app.services.availability import init_availability
+from app.services.catalog import init_catalog
+from app.services.search_index import init_fts
+from app.services.trending import init_rollup, init_trending
+
+BASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Movies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        release_year INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS Streaming_Services (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        service_name TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS Movie_Streamings (
+        movie_id INTEGER,
+        service_id INTEGER,
+        PRIMARY KEY (movie_id, service_id),
+        FOREIGN KEY (movie_id) REFERENCES Movies(id),
+        FOREIGN KEY (service_id) REFERENCES Streaming_Services(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS Movie_Search_History (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        movie_id INTEGER NOT NULL,
+        search_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (movie_id) REFERENCES Movies(id)
+    );
+
+    -- Insert default streaming services if they don't exist
+    INSERT OR IGNORE INTO Streaming_Services (service_name) VALUES
+        ('Netflix'),
+        ('Amazon Prime'),
+        ('Disney+'),
+        ('Hulu'),
+        ('HBO Max');
+"""
+
+SECONDARY_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_search_history_movie_time
+        ON Movie_Search_History (movie_id, search_timestamp);
+
+    CREATE INDEX IF NOT EXISTS idx_movie_streamings_service
+        ON Movie_Streamings (service_id, movie_id);
+
+    CREATE INDEX IF NOT EXISTS idx_movies_title_nocase
+        ON Movies (title COLLATE NOCASE);
+
+    -- Serves the LOWER(service_name) lookups of search service filters
+    CREATE INDEX IF NOT EXISTS idx_streaming_services_name_lower
+        ON Streaming_Services (LOWER(service_name));
+"""
+
+# History shards have no Movies table to reference
+SHARD_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Movie_Search_History (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        movie_id INTEGER NOT NULL,
+        search_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_search_history_movie_time
+        ON Movie_Search_History (movie_id, search_timestamp);
+"""
+
+def _script(sql: str) -> Callable[[sqlite3.Connection], None]:
+    return lambda conn: conn.executescript(sql)
+
+MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("base tables and default services", _script(BASE_SCHEMA)),
+    ("catalog version counters", init_catalog),
+    ("title full-text index", init_fts),
+    ("trending counters", init_trending),
+    ("secondary indexes", _script(SECONDARY_INDEXES)),
+    ("search history rollups", init_rollup),
+    ("denormalized movie availability", init_availability),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+SHARD_MIGRATIONS: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("search history", _script(SHARD_SCHEMA)),
+    ("trending counters", init_trending),
+    ("search history rollups", init_rollup),
+]
+
+SHARD_SCHEMA_VERSION = len(SHARD_MIGRATIONS)
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: sqlite3.Connection,
+            migrations: List[Tuple[str, Callable[[sqlite3.Connection], None]]] = MIGRATIONS) -> int:
+    """Apply pending migrations in order and return the resulting schema version"""
+    version = schema_version(conn)
+    for number, (_, apply) in enumerate(migrations[version:], start=version + 1):
+        apply(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    return max(version, len(migrations))
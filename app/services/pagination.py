@@ -0,0 +1,27 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+def encode_cursor(key: Optional[Tuple]) -> Optional[str]:
+    """Encode a keyset position as an opaque URL-safe token"""
+    if key is None:
+        return None
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str, types: Tuple[type, ...]) -> Tuple:
+    """Decode a cursor token, checking it holds values of the given types.
+
+    Raises ValueError for anything that was not produced by encode_cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Malformed cursor")
+    try:
+        return tuple(expected(value) for expected, value in zip(types, values))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
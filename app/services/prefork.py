@@ -0,0 +1,219 @@
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Union
+
+from app import create_app
+from app.services.database import close_pool
+from app.services.db_executor import close_db_executor
+from app.services.history_rollup import close_history_compactor
+from app.services.history_shards import close_history_shards, refresh_trending
+from app.services.history_writer import HistoryChannel, get_history_writer
+from app.services.snapshot import close_snapshot
+
+logger = logging.getLogger(__name__)
+
+TRENDING_REFRESH_INTERVAL = 60.0  # seconds between trending window checks in the writer
+RESTART_DELAY = 1.0  # minimum seconds between starts of one child, so one failing at startup cannot fork-loop
+
+WRITER = 'writer'
+
+_STOP_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+def _spawn(target: Callable[[], None]) -> int:
+    # Hold stop signals until the child has dropped the master's handlers, which
+    # would otherwise swallow a SIGTERM sent while the child starts up
+    signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+    try:
+        pid = os.fork()
+        if not pid:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+    if pid:
+        return pid
+    code = 0
+    try:
+        target()
+    except BaseException:
+        logger.exception("Prefork child failed")
+        code = 1
+    finally:
+        os._exit(code)
+
+def _child_signals(on_term: Callable[[], None]):
+    # The master relays Ctrl-C as SIGTERM, so children ignore the terminal's SIGINT
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: on_term())
+
+def run_writer(config_name: str, channel):
+    """Write every worker's search history and keep trending windows current.
+
+    The only process that writes to the database while the server runs,
+    besides the history compactor it starts.
+    """
+    stopped = threading.Event()
+    _child_signals(stopped.set)
+    app = create_app(config_name, CATALOG_SNAPSHOT=False)
+    with app.app_context():
+        writer = get_history_writer()
+
+    next_refresh = 0.0
+    try:
+        while not stopped.is_set():
+            try:
+                timestamp, movie_ids = channel.get(timeout=1.0)
+                writer.record(movie_ids, timestamp)
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_refresh:
+                with app.app_context():
+                    try:
+                        refresh_trending()
+                    except sqlite3.Error as e:
+                        logger.error(f"Error refreshing trending windows: {e}")
+                next_refresh = time.monotonic() + TRENDING_REFRESH_INTERVAL
+        # Workers have exited by now; write whatever they left in the channel
+        while True:
+            try:
+                timestamp, movie_ids = channel.get_nowait()
+            except queue.Empty:
+                break
+            writer.record(movie_ids, timestamp)
+    finally:
+        writer.close()
+        close_history_compactor(app)
+        close_history_shards(app)
+        close_pool(app)
+
+def run_worker(config_name: str, listener: socket.socket, channel):
+    """Serve requests from the shared listening socket over read-only connections"""
+    from werkzeug.serving import make_server
+    app = create_app(config_name, DB_READ_ONLY=True, HISTORY_ASYNC=True, HISTORY_COMPACT_INTERVAL=0)
+    history = HistoryChannel(channel)
+    app.extensions['history_writer'] = history
+
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    # shutdown() waits for serve_forever() to return, so it cannot run in the handler itself
+    _child_signals(lambda: threading.Thread(target=server.shutdown, daemon=True).start())
+    try:
+        server.serve_forever()
+    finally:
+        history.close()
+        close_snapshot(app)
+        close_db_executor(app)
+        close_history_shards(app)
+        close_pool(app)
+
+class PreforkServer:
+    """Serve the app from forked worker processes sharing one listening socket.
+
+    The master migrates the database, binds the socket and forks one writer
+    process plus workers workers, then only supervises: children that die
+    are replaced, no sooner than RESTART_DELAY after their last start, and
+    SIGTERM or SIGINT stops the workers first and the writer last so no
+    queued history is lost. The master starts no threads,
+    so forking replacements stays safe.
+    """
+
+    def __init__(self, config_name: str = 'production', host: str = '0.0.0.0', port: int = 5000,
+                 workers: int = 0, backlog: int = 1024):
+        self.config_name = config_name
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.stopping = False
+        self.listener = None
+        self.channel = None
+        self.writer_pid = None
+        self.worker_pids: Dict[int, int] = {}
+        self.started_at: Dict[Union[str, int], float] = {}
+        self.restarts: Dict[Union[str, int], float] = {}  # children waiting to be restarted, by when
+
+        # Runs pending migrations; no background threads before the fork
+        app = create_app(config_name, CATALOG_SNAPSHOT=False, HISTORY_COMPACT_INTERVAL=0)
+        self.workers = workers or app.config['PREFORK_WORKERS'] or os.cpu_count() or 1
+        self.queue_size = app.config['HISTORY_QUEUE_SIZE']
+
+    def _spawn_writer(self):
+        self.started_at[WRITER] = time.monotonic()
+        self.writer_pid = _spawn(lambda: run_writer(self.config_name, self.channel))
+
+    def _spawn_worker(self, number: int):
+        self.started_at[number] = time.monotonic()
+        pid = _spawn(lambda: run_worker(self.config_name, self.listener, self.channel))
+        self.worker_pids[pid] = number
+
+    def _restart_due(self):
+        now = time.monotonic()
+        for child, due in list(self.restarts.items()):
+            if due <= now:
+                del self.restarts[child]
+                if child == WRITER:
+                    self._spawn_writer()
+                else:
+                    self._spawn_worker(child)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def serve_forever(self):
+        self.listener = socket.create_server((self.host, self.port), backlog=self.backlog)
+        self.channel = multiprocessing.get_context('fork').Queue(maxsize=self.queue_size)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self._spawn_writer()
+        for number in range(self.workers):
+            self._spawn_worker(number)
+        host, port = self.listener.getsockname()[:2]
+        logger.info(f"Serving on http://{host}:{port} with {self.workers} workers")
+
+        try:
+            while not self.stopping:
+                self._restart_due()
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    pid = 0  # every child is waiting to be restarted
+                if not pid:
+                    time.sleep(0.2)
+                    continue
+                if pid == self.writer_pid:
+                    self.writer_pid = None
+                    child = WRITER
+                    logger.error(f"History writer exited with status {status}; restarting it")
+                elif pid in self.worker_pids:
+                    child = self.worker_pids.pop(pid)
+                    logger.error(f"Worker {child} exited with status {status}; restarting it")
+                else:
+                    continue
+                self.restarts[child] = self.started_at[child] + RESTART_DELAY
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        self.listener.close()
+        for pid in self.worker_pids:
+            _terminate(pid)
+        for pid in self.worker_pids:
+            os.waitpid(pid, 0)
+        self.worker_pids.clear()
+        if self.writer_pid is not None:
+            _terminate(self.writer_pid)
+            os.waitpid(self.writer_pid, 0)
+            self.writer_pid = None
+
+def _terminate(pid: int):
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
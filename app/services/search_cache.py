@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+from flask import current_app
+from app.services.search_filters import SearchFilters
+
+class SearchCache:
+    """LRU + TTL cache of search results tagged with the catalog version.
+
+    Any catalog write bumps the version, and the first lookup that sees the
+    new version drops every entry.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, value):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+def normalize_key(query: str, filters: SearchFilters) -> Tuple:
+    return (' '.join(query.lower().split()), filters)
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Return this app's search cache, or None when SEARCH_CACHE_SIZE is 0"""
+    if not current_app.config['SEARCH_CACHE_SIZE']:
+        return None
+    cache = current_app.extensions.get('search_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('search_cache', SearchCache(
+            max_size=current_app.config['SEARCH_CACHE_SIZE'],
+            ttl=current_app.config['SEARCH_CACHE_TTL']
+        ))
+    return cache
@@ -0,0 +1,47 @@
+from typing import Iterable, NamedTuple, Optional, Tuple, Union
+
+SERVICE_MATCH_MODES = ('any', 'all')
+
+class SearchFilters(NamedTuple):
+    """Normalized service and release-year filters for a search.
+
+    Hashable, so it can be part of a search cache key as is.
+    """
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    services: Tuple[str, ...] = ()  # lowercased, sorted, unique
+    match_all: bool = False
+
+    @classmethod
+    def build(cls, year: Optional[int] = None, service: Union[str, Iterable[str], None] = None,
+              year_from: Optional[int] = None, year_to: Optional[int] = None,
+              match: str = 'any') -> 'SearchFilters':
+        """Build filters from request-style arguments.
+
+        service is a comma-separated string or a list of names; year pins
+        both ends of the range. Raises ValueError for an unknown match mode.
+        """
+        if match not in SERVICE_MATCH_MODES:
+            raise ValueError(f"service_match must be one of {', '.join(SERVICE_MATCH_MODES)}")
+        if year:
+            year_from = year_to = year
+        if isinstance(service, str):
+            service = service.split(',')
+        services = tuple(sorted({name.strip().lower() for name in service or () if name.strip()}))
+        return cls(year_from, year_to, services, match == 'all' and len(services) > 1)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.services) or self.year_from is not None or self.year_to is not None
+
+    def matches(self, release_year: int, services: Iterable[str]) -> bool:
+        """Whether a movie with this year and these services passes the filters"""
+        if self.year_from is not None and release_year < self.year_from:
+            return False
+        if self.year_to is not None and release_year > self.year_to:
+            return False
+        if self.services:
+            names = {name.lower() for name in services}
+            found = [name in names for name in self.services]
+            return all(found) if self.match_all else any(found)
+        return True
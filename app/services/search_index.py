@@ -0,0 +1,65 @@
+import logging
+import re
+import sqlite3
+from typing import Optional
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS Movies_FTS USING fts5(
+        title,
+        content='Movies',
+        content_rowid='id'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON Movies BEGIN
+        INSERT INTO Movies_FTS (rowid, title) VALUES (new.id, new.title);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON Movies BEGIN
+        INSERT INTO Movies_FTS (Movies_FTS, rowid, title) VALUES ('delete', old.id, old.title);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title ON Movies BEGIN
+        INSERT INTO Movies_FTS (Movies_FTS, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO Movies_FTS (rowid, title) VALUES (new.id, new.title);
+    END;
+"""
+
+def init_fts(conn: sqlite3.Connection) -> bool:
+    """Create the FTS5 title index and its sync triggers.
+
+    Returns False when the SQLite build has no FTS5, in which case search
+    falls back to the LIKE scan.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Movies_FTS'")
+    exists = cursor.fetchone() is not None
+    try:
+        cursor.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 unavailable, using LIKE search: {e}")
+        return False
+
+    if not exists:
+        # Index titles that were loaded before the FTS table existed
+        cursor.execute("INSERT INTO Movies_FTS (Movies_FTS) VALUES ('rebuild')")
+    return True
+
+def has_fts(conn: sqlite3.Connection) -> bool:
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Movies_FTS'")
+    return cursor.fetchone() is not None
+
+def fts_available() -> bool:
+    return current_app.config.get('SEARCH_USE_FTS', True) and current_app.extensions.get('fts5', False)
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression of quoted prefix tokens"""
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    return ' AND '.join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,266 @@
+import logging
+import sqlite3
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+from flask import current_app
+from app.services.availability import decode
+from app.services.catalog import catalog_version
+from app.services.database import database_uri, get_db
+from app.services.search_filters import SearchFilters
+
+logger = logging.getLogger(__name__)
+
+# Past this many changed movies a full reload is cheaper than patching
+INCREMENTAL_REFRESH_LIMIT = 1000
+
+class MovieRecord:
+    __slots__ = ('id', 'title', 'release_year', 'version', 'services')
+
+    def __init__(self, id: int, title: str, release_year: int, version: int, services: Tuple[str, ...]):
+        self.id = id
+        self.title = title
+        self.release_year = release_year
+        self.version = version
+        self.services = services
+
+def _build_bitmaps(pairs: Iterable[Tuple[Hashable, int]]) -> Dict[Hashable, int]:
+    # Set bits in bytearrays, then convert once; OR-ing ints one bit at a time is quadratic
+    arrays = defaultdict(bytearray)
+    for key, movie_id in pairs:
+        bits = arrays[key]
+        byte = movie_id >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        bits[byte] |= 1 << (movie_id & 7)
+    return {key: int.from_bytes(bits, 'little') for key, bits in arrays.items()}
+
+def _bitmap_pairs(records: Iterable[MovieRecord]) -> Iterator[Tuple[str, Hashable, int]]:
+    for record in records:
+        yield 'year', record.release_year, record.id
+        for name in record.services:
+            yield 'service', name.lower(), record.id
+
+class Bitmap:
+    """Movie id membership over a bitmap, with O(1) lookups"""
+
+    __slots__ = ('_bytes',)
+
+    def __init__(self, bits: int):
+        self._bytes = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+    def __contains__(self, movie_id: int) -> bool:
+        byte = movie_id >> 3
+        return byte < len(self._bytes) and bool(self._bytes[byte] >> (movie_id & 7) & 1)
+
+    def __bool__(self) -> bool:
+        return bool(self._bytes)
+
+@contextmanager
+def _read_transaction(conn: sqlite3.Connection):
+    # Read every table inside one transaction so the copy is consistent
+    cursor = conn.cursor()
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        cursor.execute("BEGIN")
+    try:
+        yield cursor
+    finally:
+        if own_transaction:
+            cursor.execute("COMMIT")
+
+def _load_movies(cursor: sqlite3.Cursor, names: Dict[int, str],
+                 movie_ids: Optional[List[int]] = None) -> Dict[int, MovieRecord]:
+    """Load records for movie_ids, or for the whole catalog when None"""
+    movies_where = ""
+    if movie_ids is not None:
+        movies_where = f"WHERE m.id IN ({', '.join('?' * len(movie_ids))})"
+    # Share one tuple per distinct availability, and one string per service name
+    interned = {name: name for name in names.values()}
+    services = {}
+    records = {}
+    cursor.execute(f"""
+        SELECT m.id, m.title, m.release_year, m.availability, COALESCE(v.version, 0)
+        FROM Movies m
+        LEFT JOIN Movie_Versions v ON v.movie_id = m.id
+        {movies_where}
+    """, movie_ids or ())
+    for movie_id, title, release_year, availability, movie_version in cursor:
+        movie_services = services.get(availability)
+        if movie_services is None:
+            movie_services = services[availability] = tuple(
+                interned.get(name, name) for name in decode(availability)
+            )
+        records[movie_id] = MovieRecord(movie_id, title, release_year, movie_version, movie_services)
+    return records
+
+class CatalogSnapshot:
+    """Read-only copy of the catalog, loaded in one consistent read transaction.
+
+    Service names are interned once and shared by every movie's services
+    tuple. Per-service and per-year bitmaps over movie ids (Python ints, bit
+    n set for movie n) turn search filters into bitwise intersections.
+    Snapshots are never mutated; a newer catalog version is published by
+    swapping in a new snapshot.
+    """
+
+    __slots__ = ('version', 'services_version', 'service_names', 'movies', 'services',
+                 'service_bitmaps', 'year_bitmaps')
+
+    def __init__(self, version: int, services_version: int, service_names: Dict[int, str],
+                 movies: Dict[int, MovieRecord], service_bitmaps: Dict[str, int],
+                 year_bitmaps: Dict[int, int]):
+        self.version = version
+        self.services_version = services_version
+        self.service_names = service_names
+        self.movies = movies
+        self.services = tuple(sorted(service_names.values()))
+        self.service_bitmaps = service_bitmaps
+        self.year_bitmaps = year_bitmaps
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> 'CatalogSnapshot':
+        with _read_transaction(conn) as cursor:
+            version = catalog_version(conn)
+            cursor.execute("SELECT version FROM Services_Version WHERE id = 1")
+            services_version = cursor.fetchone()[0]
+            cursor.execute("SELECT id, service_name FROM Streaming_Services")
+            names = {service_id: sys.intern(name) for service_id, name in cursor.fetchall()}
+            movies = _load_movies(cursor, names)
+
+        pairs = defaultdict(list)
+        for kind, key, movie_id in _bitmap_pairs(movies.values()):
+            pairs[kind].append((key, movie_id))
+        return cls(version, services_version, names, movies,
+                   _build_bitmaps(pairs['service']), _build_bitmaps(pairs['year']))
+
+    def refreshed(self, conn: sqlite3.Connection) -> 'CatalogSnapshot':
+        """Return a snapshot of the current catalog, reusing this one where possible.
+
+        Movies whose Movie_Versions entry moved past this snapshot's version
+        are reloaded and patched into a copy; service changes, or too many
+        changed movies, fall back to a full load.
+        """
+        if catalog_version(conn) == self.version:
+            return self
+
+        with _read_transaction(conn) as cursor:
+            version = catalog_version(conn)
+            cursor.execute("SELECT version FROM Services_Version WHERE id = 1")
+            if cursor.fetchone()[0] != self.services_version:
+                return CatalogSnapshot.load(conn)
+            cursor.execute(
+                "SELECT movie_id FROM Movie_Versions WHERE version > ? LIMIT ?",
+                (self.version, INCREMENTAL_REFRESH_LIMIT + 1)
+            )
+            changed = [row[0] for row in cursor.fetchall()]
+            if len(changed) > INCREMENTAL_REFRESH_LIMIT:
+                return CatalogSnapshot.load(conn)
+            reloaded = _load_movies(cursor, self.service_names, changed) if changed else {}
+
+        movies = dict(self.movies)
+        bitmaps = {'service': dict(self.service_bitmaps), 'year': dict(self.year_bitmaps)}
+        masks = defaultdict(lambda: [0, 0])  # (kind, key) -> [bits to clear, bits to set]
+        for movie_id in changed:
+            old = movies.pop(movie_id, None)
+            if old is not None:
+                for kind, key, _ in _bitmap_pairs((old,)):
+                    masks[kind, key][0] |= 1 << movie_id
+            new = reloaded.get(movie_id)
+            if new is not None:
+                movies[movie_id] = new
+                for kind, key, _ in _bitmap_pairs((new,)):
+                    masks[kind, key][1] |= 1 << movie_id
+        for (kind, key), (clear, set_bits) in masks.items():
+            bits = (bitmaps[kind].get(key, 0) & ~clear) | set_bits
+            if bits:
+                bitmaps[kind][key] = bits
+            else:
+                bitmaps[kind].pop(key, None)
+        return CatalogSnapshot(version, self.services_version, self.service_names, movies,
+                               bitmaps['service'], bitmaps['year'])
+
+    def filter_bitmap(self, filters: SearchFilters) -> Bitmap:
+        """Intersect the service and year bitmaps selected by active filters"""
+        bits = -1  # every bit set until a filter narrows it
+        if filters.services:
+            selected = [self.service_bitmaps.get(name, 0) for name in filters.services]
+            combined = selected[0]
+            for service_bits in selected[1:]:
+                combined = combined & service_bits if filters.match_all else combined | service_bits
+            bits &= combined
+        if filters.year_from is not None or filters.year_to is not None:
+            low = filters.year_from if filters.year_from is not None else float('-inf')
+            high = filters.year_to if filters.year_to is not None else float('inf')
+            combined = 0
+            for year, year_bits in self.year_bitmaps.items():
+                if low <= year <= high:
+                    combined |= year_bits
+            bits &= combined
+        return Bitmap(bits)
+
+    def movie_etag(self, movie_id: int) -> str:
+        return f"movie-{movie_id}-{self.movies[movie_id].version}-{self.services_version}"
+
+    def services_etag(self) -> str:
+        return f"services-{self.services_version}"
+
+class SnapshotHolder:
+    """Publishes the latest CatalogSnapshot for one app.
+
+    With a positive refresh interval a background thread builds the first
+    snapshot and then polls the catalog version, so reads never touch SQLite.
+    With an interval of 0 every read checks the version inline instead.
+    """
+
+    def __init__(self, database: str, refresh_interval: float):
+        self.database = database
+        self.refresh_interval = refresh_interval
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._stopped = threading.Event()
+        self._refresh_lock = threading.Lock()
+        if refresh_interval > 0:
+            threading.Thread(target=self._run, name='catalog-snapshot', daemon=True).start()
+
+    def current(self) -> Optional[CatalogSnapshot]:
+        if self.refresh_interval <= 0:
+            self.refresh(get_db())
+        return self.snapshot
+
+    def refresh(self, conn: sqlite3.Connection):
+        with self._refresh_lock:
+            snapshot = self.snapshot
+            self.snapshot = CatalogSnapshot.load(conn) if snapshot is None else snapshot.refreshed(conn)
+
+    def close(self):
+        self._stopped.set()
+
+    def _run(self):
+        conn = sqlite3.connect(self.database, uri=True)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self.refresh(conn)
+                except sqlite3.Error as e:
+                    logger.error(f"Error refreshing catalog snapshot: {e}")
+                self._stopped.wait(self.refresh_interval)
+        finally:
+            conn.close()
+
+def init_snapshot(app):
+    if app.config['CATALOG_SNAPSHOT']:
+        app.extensions['catalog_snapshot'] = SnapshotHolder(
+            database_uri(app.config), app.config['CATALOG_SNAPSHOT_REFRESH']
+        )
+
+def close_snapshot(app):
+    holder = app.extensions.pop('catalog_snapshot', None)
+    if holder is not None:
+        holder.close()
+
+def get_snapshot() -> Optional[CatalogSnapshot]:
+    """Return the current catalog snapshot, or None if disabled or not built yet"""
+    holder = current_app.extensions.get('catalog_snapshot')
+    return holder.current() if holder is not None else None
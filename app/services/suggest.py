@@ -0,0 +1,98 @@
+import heapq
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+from flask import current_app
+from app.services.catalog import catalog_version
+from app.services.catalog_index import CatalogIndex
+from app.services.history_shards import all_time_counts
+from app.services.snapshot import get_snapshot
+
+# Prefixes matching more keys than this have their top suggestions ranked
+# when the index is built, so a request never ranks more than this many
+RANK_LIMIT = 256
+MAX_SUGGESTIONS = 20
+
+_TOKEN_RE = re.compile(r'\w+')
+
+def normalize_title(title: str) -> str:
+    return ' '.join(_TOKEN_RE.findall(title.lower()))
+
+class SuggestIndex:
+    """Prefix index over normalized titles, ranked by search popularity.
+
+    Every word of a title starts a key, so 'matrix' finds 'The Matrix'. Keys
+    live in one sorted list and a prefix lookup bisects to its range. Broad
+    prefixes, the trie nodes with many keys below them, keep a precomputed
+    top list; narrow ones rank their short range per request.
+    """
+
+    def __init__(self, titles: Iterable[Tuple[int, str]], weights: Dict[int, float], version: int):
+        self.version = version
+        self.titles: Dict[int, str] = {}
+        entries = []
+        for movie_id, title in titles:
+            self.titles[movie_id] = title
+            words = normalize_title(title).split(' ')
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), movie_id))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [movie_id for _, movie_id in entries]
+
+        # Rank every movie once; ranking a range is then a top-k over integers
+        order = sorted(self.titles, key=lambda movie_id: (-weights.get(movie_id, 0), self.titles[movie_id], movie_id))
+        self._position = {movie_id: position for position, movie_id in enumerate(order)}
+        self.top: Dict[str, List[int]] = {}
+        self._precompute(0, len(self.keys), 0)
+
+    def _precompute(self, start: int, end: int, depth: int):
+        # keys[start:end] share a prefix of length depth; split them by the next character
+        i = start
+        while i < end:
+            if len(self.keys[i]) <= depth:
+                i += 1
+                continue
+            prefix = self.keys[i][:depth + 1]
+            j = bisect_left(self.keys, prefix + '\uffff', i, end)
+            if j - i > RANK_LIMIT:
+                self.top[prefix] = self._rank(self.ids[i:j], MAX_SUGGESTIONS)
+                self._precompute(i, j, depth + 1)
+            i = j
+
+    def _rank(self, movie_ids: Iterable[int], limit: int) -> List[int]:
+        return heapq.nsmallest(limit, set(movie_ids), key=self._position.__getitem__)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Tuple[int, str]]:
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+        top = self.top.get(prefix)
+        if top is not None:
+            movie_ids = top[:limit]
+        else:
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + '\uffff', start)
+            movie_ids = self._rank(self.ids[start:end], limit)
+        return [(movie_id, self.titles[movie_id]) for movie_id in movie_ids]
+
+def _build_index(db) -> SuggestIndex:
+    snapshot = get_snapshot()
+    cursor = db.cursor()
+    if snapshot is not None:
+        version = snapshot.version
+        titles = [(record.id, record.title) for record in snapshot.movies.values()]
+    else:
+        version = catalog_version(db)
+        cursor.execute("SELECT id, title FROM Movies")
+        titles = [(row[0], row[1]) for row in cursor.fetchall()]
+    return SuggestIndex(titles, all_time_counts(db), version)
+
+def init_suggest_index(app):
+    """Rebuild the suggest index after catalog changes or SUGGEST_REFRESH seconds, for new weights"""
+    app.extensions['suggest_index'] = CatalogIndex(
+        app, 'suggest index', _build_index, max_age=app.config['SUGGEST_REFRESH']
+    )
+
+def get_suggest_index() -> SuggestIndex:
+    return current_app.extensions['suggest_index'].current()
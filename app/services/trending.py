@@ -0,0 +1,340 @@
+import sqlite3
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+
+# Rolling windows in hours; None counts every search ever recorded
+TRENDING_WINDOWS: Dict[str, Optional[int]] = {
+    'hour': 1,
+    'day': 24,
+    'week': 24 * 7,
+    'all': None,
+}
+DECAY_WINDOW = 'decay'
+BUCKET_RETENTION_HOURS = max(hours for hours in TRENDING_WINDOWS.values() if hours)
+
+# Hourly bucket of a history timestamp, as an integer count of hours since the epoch
+_BUCKET = "(CAST(strftime('%s', COALESCE({ts}, CURRENT_TIMESTAMP)) AS INTEGER) / 3600)"
+_NEW_BUCKET = _BUCKET.format(ts='new.search_timestamp')
+_OLD_BUCKET = _BUCKET.format(ts='old.search_timestamp')
+_DECAY_WEIGHT = ("pow(2.0, ({bucket} - (SELECT base_bucket FROM Trending_Decay)) * 1.0 "
+                 "/ (SELECT half_life_hours FROM Trending_Decay))")
+
+TRENDING_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS Search_Count_Buckets (
+        bucket INTEGER NOT NULL,
+        movie_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (bucket, movie_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS Trending_Windows (
+        window_name TEXT PRIMARY KEY,
+        hours INTEGER,
+        expired_through INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS Trending_Counters (
+        window_name TEXT NOT NULL,
+        movie_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (window_name, movie_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_trending_counters_score
+        ON Trending_Counters (window_name, score DESC, movie_id);
+
+    CREATE TABLE IF NOT EXISTS Trending_Decay (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        base_bucket INTEGER NOT NULL,
+        half_life_hours REAL NOT NULL
+    );
+
+    -- Searches rolled up out of Movie_Search_History, per day; anything
+    -- counting history from the raw rows must add these in
+    CREATE TABLE IF NOT EXISTS Search_History_Daily (
+        day INTEGER NOT NULL,
+        movie_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, movie_id)
+    );
+
+    -- History rows with id <= rolled_through live on only in Search_History_Daily
+    CREATE TABLE IF NOT EXISTS History_Rollup (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        rolled_through INTEGER NOT NULL
+    );
+
+    INSERT OR IGNORE INTO History_Rollup (id, rolled_through) VALUES (1, 0);
+
+    CREATE TRIGGER IF NOT EXISTS trending_history_insert AFTER INSERT ON Movie_Search_History BEGIN
+        INSERT INTO Search_Count_Buckets (bucket, movie_id, count)
+        VALUES ({_NEW_BUCKET}, new.movie_id, 1)
+        ON CONFLICT (bucket, movie_id) DO UPDATE SET count = count + 1;
+
+        INSERT INTO Trending_Counters (window_name, movie_id, score)
+        SELECT window_name, new.movie_id, 1 FROM Trending_Windows
+        WHERE expired_through < {_NEW_BUCKET}
+        ON CONFLICT (window_name, movie_id) DO UPDATE SET score = score + 1;
+    END;
+
+    -- Deleting rolled-up rows must not take back searches the counters already hold
+    CREATE TRIGGER IF NOT EXISTS trending_history_delete AFTER DELETE ON Movie_Search_History
+    WHEN old.id > (SELECT rolled_through FROM History_Rollup) BEGIN
+        UPDATE Search_Count_Buckets SET count = count - 1
+        WHERE bucket = {_OLD_BUCKET} AND movie_id = old.movie_id;
+
+        UPDATE Trending_Counters SET score = score - 1
+        WHERE movie_id = old.movie_id AND window_name IN (
+            SELECT window_name FROM Trending_Windows WHERE expired_through < {_OLD_BUCKET}
+        );
+    END;
+"""
+
+# Only created when the SQLite build ships the math functions (pow)
+DECAY_SCHEMA = f"""
+    CREATE TRIGGER IF NOT EXISTS trending_decay_insert AFTER INSERT ON Movie_Search_History BEGIN
+        INSERT INTO Trending_Counters (window_name, movie_id, score)
+        VALUES ('{DECAY_WINDOW}', new.movie_id, {_DECAY_WEIGHT.format(bucket=_NEW_BUCKET)})
+        ON CONFLICT (window_name, movie_id) DO UPDATE SET score = score + excluded.score;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trending_decay_delete AFTER DELETE ON Movie_Search_History
+    WHEN old.id > (SELECT rolled_through FROM History_Rollup) BEGIN
+        UPDATE Trending_Counters SET score = score - {_DECAY_WEIGHT.format(bucket=_OLD_BUCKET)}
+        WHERE window_name = '{DECAY_WINDOW}' AND movie_id = old.movie_id;
+    END;
+"""
+
+# Rescale decayed scores before 2 ** (age / half_life) gets anywhere near float limits
+_MAX_DECAY_HALF_LIVES = 32
+
+def current_bucket() -> int:
+    return int(time.time()) // 3600
+
+def _has_math_functions(cursor: sqlite3.Cursor) -> bool:
+    try:
+        cursor.execute("SELECT pow(2.0, 1.0)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def init_trending(conn: sqlite3.Connection):
+    """Create the incremental trending counters and their history triggers.
+
+    Counters are backfilled from Movie_Search_History the first time they are
+    created, the all-time window together with Search_History_Daily. Rolled-up
+    days fall outside every hourly window as long as HISTORY_RETENTION_HOURS
+    is at least BUCKET_RETENTION_HOURS, so those windows need only the raw rows.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Trending_Counters'")
+    exists = cursor.fetchone() is not None
+    cursor.executescript(TRENDING_SCHEMA)
+    if not exists:
+        _backfill(cursor, current_bucket())
+
+def init_rollup(conn: sqlite3.Connection):
+    """Add the history rollup tables and guard the history delete triggers.
+
+    The delete triggers are recreated so that databases created before
+    rollups stop decrementing counters when rolled-up rows are deleted.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trending_decay_delete'")
+    decay_enabled = cursor.fetchone() is not None
+    cursor.executescript("""
+        DROP TRIGGER IF EXISTS trending_history_delete;
+        DROP TRIGGER IF EXISTS trending_decay_delete;
+    """)
+    cursor.executescript(TRENDING_SCHEMA)
+    if decay_enabled:
+        cursor.executescript(DECAY_SCHEMA)
+
+def init_decay(conn: sqlite3.Connection, half_life_hours: float) -> bool:
+    """Maintain decayed scores with triggers when SQLite ships math functions.
+
+    Returns whether decay triggers are in place; without them decayed scores
+    are computed from the hourly buckets on read. Scores are rebuilt when the
+    configured half-life changes. When nothing changed this only reads.
+    """
+    cursor = conn.cursor()
+    decay_enabled = _has_math_functions(cursor)
+    if decay_enabled:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trending_decay_insert'")
+        if cursor.fetchone() is None:
+            cursor.executescript(DECAY_SCHEMA)
+        cursor.execute("SELECT half_life_hours FROM Trending_Decay")
+        row = cursor.fetchone()
+        if row is None or row[0] != half_life_hours:
+            _rebuild_decay(cursor, current_bucket(), half_life_hours)
+    return decay_enabled
+
+def _backfill(cursor: sqlite3.Cursor, now: int):
+    history_bucket = _BUCKET.format(ts='search_timestamp')
+    cursor.execute(f"""
+        INSERT INTO Search_Count_Buckets (bucket, movie_id, count)
+        SELECT {history_bucket} AS bucket, movie_id, COUNT(*)
+        FROM Movie_Search_History
+        WHERE {history_bucket} > ?
+        GROUP BY bucket, movie_id
+    """, (now - BUCKET_RETENTION_HOURS,))
+
+    for window, hours in TRENDING_WINDOWS.items():
+        if hours is None:
+            cursor.execute("""
+                INSERT INTO Trending_Counters (window_name, movie_id, score)
+                SELECT ?, movie_id, SUM(count) FROM (
+                    SELECT movie_id, COUNT(*) AS count FROM Movie_Search_History GROUP BY movie_id
+                    UNION ALL
+                    SELECT movie_id, count FROM Search_History_Daily
+                ) GROUP BY movie_id
+            """, (window,))
+            expired_through = -1
+        else:
+            expired_through = now - hours
+            cursor.execute("""
+                INSERT INTO Trending_Counters (window_name, movie_id, score)
+                SELECT ?, movie_id, SUM(count) FROM Search_Count_Buckets
+                WHERE bucket > ? GROUP BY movie_id
+            """, (window, expired_through))
+        cursor.execute(
+            "INSERT INTO Trending_Windows (window_name, hours, expired_through) VALUES (?, ?, ?)",
+            (window, hours, expired_through)
+        )
+
+def _rebuild_decay(cursor: sqlite3.Cursor, now: int, half_life_hours: float):
+    cursor.execute("DELETE FROM Trending_Decay")
+    cursor.execute(
+        "INSERT INTO Trending_Decay (id, base_bucket, half_life_hours) VALUES (1, ?, ?)",
+        (now, half_life_hours)
+    )
+    cursor.execute("DELETE FROM Trending_Counters WHERE window_name = ?", (DECAY_WINDOW,))
+    cursor.execute(f"""
+        INSERT INTO Trending_Counters (window_name, movie_id, score)
+        SELECT ?, movie_id, SUM(count * {_DECAY_WEIGHT.format(bucket='bucket')})
+        FROM Search_Count_Buckets GROUP BY movie_id
+    """, (DECAY_WINDOW,))
+
+def _rebase_decay(cursor: sqlite3.Cursor, base_bucket: int, half_life_hours: float, now: int):
+    # Move the base first; a connection that read the same base finds it moved and leaves the scores alone
+    cursor.execute("UPDATE Trending_Decay SET base_bucket = ? WHERE base_bucket = ?", (now, base_bucket))
+    if cursor.rowcount == 0:
+        return
+    cursor.execute(
+        "UPDATE Trending_Counters SET score = score * ? WHERE window_name = ?",
+        (2.0 ** ((base_bucket - now) / half_life_hours), DECAY_WINDOW)
+    )
+
+def align_decay(conns: List[sqlite3.Connection]):
+    """Rebase the decayed scores of every history shard onto the latest base hour.
+
+    Decayed sort keys are only comparable across shards that share a base.
+    """
+    bases = [conn.execute("SELECT base_bucket, half_life_hours FROM Trending_Decay").fetchone()
+             for conn in conns]
+    latest = max(base[0] for base in bases)
+    for conn, (base_bucket, half_life_hours) in zip(conns, bases):
+        if base_bucket < latest:
+            _rebase_decay(conn.cursor(), base_bucket, half_life_hours, latest)
+            conn.commit()
+
+def refresh_windows(db: sqlite3.Connection, shard: Optional[int] = None):
+    """Expire hourly buckets that have rolled out of each window.
+
+    Runs at most once per hour per process and history shard; the common
+    case is a no-op. Each window's watermark is advanced before its buckets
+    are subtracted, so connections racing at the hour boundary subtract
+    them once between them.
+    """
+    now = current_bucket()
+    refreshed = current_app.extensions.setdefault('trending_refreshed', {})
+    # Read-only prefork workers leave this to the writer process
+    if current_app.config['DB_READ_ONLY'] or refreshed.get(shard) == now:
+        return
+
+    cursor = db.cursor()
+    cursor.execute("SELECT window_name, hours, expired_through FROM Trending_Windows WHERE hours IS NOT NULL")
+    for window, hours, expired_through in cursor.fetchall():
+        cutoff = now - hours
+        if expired_through >= cutoff:
+            continue
+        # Takes the write lock; another connection that read the same watermark updates nothing
+        cursor.execute(
+            "UPDATE Trending_Windows SET expired_through = ? WHERE window_name = ? AND expired_through = ?",
+            (cutoff, window, expired_through)
+        )
+        if cursor.rowcount == 0:
+            continue
+        cursor.execute("""
+            UPDATE Trending_Counters SET score = score - (
+                SELECT SUM(b.count) FROM Search_Count_Buckets b
+                WHERE b.movie_id = Trending_Counters.movie_id AND b.bucket > ? AND b.bucket <= ?
+            )
+            WHERE window_name = ? AND movie_id IN (
+                SELECT movie_id FROM Search_Count_Buckets WHERE bucket > ? AND bucket <= ?
+            )
+        """, (expired_through, cutoff, window, expired_through, cutoff))
+
+    if current_app.extensions.get('trending_decay'):
+        cursor.execute("SELECT base_bucket, half_life_hours FROM Trending_Decay")
+        base_bucket, half_life_hours = cursor.fetchone()
+        if now - base_bucket > _MAX_DECAY_HALF_LIVES * half_life_hours:
+            _rebase_decay(cursor, base_bucket, half_life_hours, now)
+
+    cursor.execute("DELETE FROM Trending_Counters WHERE score <= 1e-9")
+    cursor.execute("DELETE FROM Search_Count_Buckets WHERE bucket <= ? OR count <= 0",
+                   (now - BUCKET_RETENTION_HOURS,))
+    db.commit()
+    refreshed[shard] = now
+
+def _decay_from_buckets(db: sqlite3.Connection, limit: int,
+                        after: Optional[Tuple[float, int]]) -> List[Tuple[int, float, float]]:
+    # Fallback for SQLite builds without pow(): weight the retained buckets in Python
+    half_life_hours = current_app.config['TRENDING_HALF_LIFE_HOURS']
+    now = current_bucket()
+    scores = defaultdict(float)
+    cursor = db.cursor()
+    cursor.execute("SELECT bucket, movie_id, count FROM Search_Count_Buckets")
+    for bucket, movie_id, count in cursor.fetchall():
+        scores[movie_id] += count * 2.0 ** ((bucket - now) / half_life_hours)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    if after is not None:
+        ranked = [(movie_id, score) for movie_id, score in ranked
+                  if score < after[0] or (score == after[0] and movie_id > after[1])]
+    return [(movie_id, score, score) for movie_id, score in ranked[:limit]]
+
+def top_movies(db: sqlite3.Connection, window: str, limit: int,
+               after: Optional[Tuple[float, int]] = None,
+               shard: Optional[int] = None) -> List[Tuple[int, float, float]]:
+    """Return up to limit (movie_id, view_count, sort_key) rows for a window, best first.
+
+    after is the (sort_key, movie_id) of the last row of the previous page.
+    Decayed view counts are reported in units of searches as of the current hour.
+    """
+    refresh_windows(db, shard)
+    if window == DECAY_WINDOW and not current_app.extensions.get('trending_decay'):
+        return _decay_from_buckets(db, limit, after)
+
+    query_parts = [
+        "SELECT movie_id, score FROM Trending_Counters",
+        "WHERE window_name = ? AND score > 1e-9"
+    ]
+    params = [window]
+    if after is not None:
+        query_parts.append("AND (score < ? OR (score = ? AND movie_id > ?))")
+        params.extend([after[0], after[0], after[1]])
+    query_parts.append("ORDER BY score DESC, movie_id LIMIT ?")
+    params.append(limit)
+
+    cursor = db.cursor()
+    cursor.execute(" ".join(query_parts), params)
+    rows = cursor.fetchall()
+    if window != DECAY_WINDOW:
+        return [(movie_id, int(score), score) for movie_id, score in rows]
+
+    cursor.execute("SELECT base_bucket, half_life_hours FROM Trending_Decay")
+    base_bucket, half_life_hours = cursor.fetchone()
+    scale = 2.0 ** ((base_bucket - current_bucket()) / half_life_hours)
+    return [(movie_id, score * scale, score) for movie_id, score in rows]
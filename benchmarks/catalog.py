@@ -0,0 +1,94 @@
+"""Synthetic catalog generator for benchmarks.
+
+Titles are built from a fixed vocabulary so that search queries drawn from
+the same words hit realistic result-set sizes. Search history follows a Zipf
+distribution over movies, so trending has a long tail like real traffic.
+"""
+import bisect
+import random
+import sqlite3
+import time
+from itertools import accumulate
+from typing import Iterator, List, Sequence
+
+VOCABULARY = (
+    "dark knight matrix star wars lord rings fellowship return king empire "
+    "strikes back space odyssey inception interstellar gravity alien arrival "
+    "blade runner dune godfather pulp fiction fight club forrest gump titanic "
+    "avatar jaws rocky heat casino goodfellas memento prestige psycho vertigo "
+    "shining frozen coco up cars toy story finding nemo lion monsters wall "
+    "love night day city river mountain ocean fire ice storm shadow light "
+    "last first final secret hidden lost broken silent golden iron crimson "
+    "war peace dream house road journey escape legend rise fall edge world"
+).split()
+
+class ZipfSampler:
+    """Draw indexes 0..n-1 with probability proportional to 1 / (rank + 1) ** s"""
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        self.rng = rng
+        self.cumulative = list(accumulate(1.0 / (rank + 1) ** s for rank in range(n)))
+
+    def sample(self) -> int:
+        point = self.rng.random() * self.cumulative[-1]
+        return min(bisect.bisect_left(self.cumulative, point), len(self.cumulative) - 1)
+
+def make_title(rng: random.Random, index: int) -> str:
+    words = rng.sample(VOCABULARY, rng.randint(1, 4))
+    # The index keeps (title, year) natural keys unique
+    return " ".join(word.capitalize() for word in words) + f" {index}"
+
+def query_terms(rng: random.Random, count: int, s: float = 1.1) -> List[str]:
+    """Search queries drawn Zipf-style from the title vocabulary"""
+    words = list(VOCABULARY)
+    rng.shuffle(words)
+    sampler = ZipfSampler(len(words), s, rng)
+    return [words[sampler.sample()] for _ in range(count)]
+
+def generate_catalog(conn: sqlite3.Connection, movies: int, services: int, density: float,
+                     history: int, zipf_s: float = 1.1, seed: int = 42,
+                     report=print) -> dict:
+    """Populate an initialized database; returns the generation parameters and timings"""
+    # Imported here: importing the app reads config, and callers set DATABASE_PATH first
+    from app.services.ingest import CatalogLoader, chunked
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    movie_rows = [{"title": make_title(rng, i), "release_year": rng.randint(1920, 2024)}
+                  for i in range(movies)]
+    service_names = [f"Service {i}" for i in range(services)]
+
+    def availability() -> Iterator[dict]:
+        for movie in movie_rows:
+            count = min(services, max(0, int(rng.expovariate(1.0 / density)) if density else 0))
+            for name in rng.sample(service_names, count):
+                yield {"title": movie["title"], "release_year": movie["release_year"],
+                       "service_name": name}
+
+    with CatalogLoader(conn, report=lambda message: None) as loader:
+        loader.load_movies(movie_rows)
+        loader.load_services({"service_name": name} for name in service_names)
+        loader.load_availability(availability())
+        movie_ids: Sequence[int] = [loader.movie_ids[(m["title"], m["release_year"])]
+                                    for m in movie_rows]
+
+    sampler = ZipfSampler(len(movie_ids), zipf_s, rng)
+    popularity = list(movie_ids)
+    rng.shuffle(popularity)
+    for chunk in chunked((popularity[sampler.sample()] for _ in range(history)), 50000):
+        with conn:
+            conn.executemany("INSERT INTO Movie_Search_History (movie_id) VALUES (?)",
+                             [(movie_id,) for movie_id in chunk])
+
+    elapsed = time.perf_counter() - started
+    report(f"Generated {movies:,} movies, {services} services and {history:,} searches in {elapsed:.1f}s")
+    return {
+        "movies": movies,
+        "services": services,
+        "density": density,
+        "history": history,
+        "zipf_s": zipf_s,
+        "seed": seed,
+        "generate_seconds": round(elapsed, 3),
+    }
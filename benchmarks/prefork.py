@@ -0,0 +1,138 @@
+"""Benchmark read throughput of the prefork server as workers are added.
+
+Generates a catalog once, then for each worker count starts serve.py and
+drives read endpoints over HTTP from several load-generator processes, so
+the client is not the bottleneck. Throughput should grow close to linearly
+with workers up to the number of cores.
+
+    python -m benchmarks.prefork --workers 1 2 4 8 --requests 4000 --output prefork.json
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+from benchmarks.catalog import generate_catalog
+from benchmarks.run import endpoint_urls, git_commit, run_http
+
+READ_ENDPOINTS = ("search", "movie", "streaming", "services")
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _drive(job) -> Dict:
+    base_url, urls, threads = job
+    return run_http(base_url, urls, threads)
+
+def start_server(database: str, workers: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ, DATABASE_PATH=database)
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--config', 'production', '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(base_url + '/api/health').read()
+            return server, base_url
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit(f"serve.py with {workers} workers did not start")
+
+def measure(base_url: str, urls: List[str], clients: int, threads: int) -> Dict:
+    slices = [(base_url, urls[number::clients], threads) for number in range(clients)]
+    started = time.perf_counter()
+    with Pool(clients) as pool:
+        parts = pool.map(_drive, slices)
+    elapsed = time.perf_counter() - started
+    requests = sum(part["requests"] for part in parts)
+    return {
+        "requests": requests,
+        "errors": sum(part["errors"] for part in parts),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p95_ms": max(part["p95_ms"] for part in parts),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark prefork throughput by worker count")
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--services', type=int, default=8)
+    parser.add_argument('--history', type=int, default=50000, help="Search-history rows")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per endpoint and worker count")
+    parser.add_argument('--clients', type=int, default=4, help="Load-generator processes")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per load-generator process")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help="Database file; defaults to a temporary file")
+    parser.add_argument('--output', help="Write results JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.database is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database = os.path.join(tmpdir.name, 'prefork.db')
+
+    # config reads DATABASE_PATH at import time; serve.py children inherit it too
+    os.environ['DATABASE_PATH'] = args.database
+    from app import create_app
+    from app.services.database import close_pool, get_db
+    app = create_app('production', CATALOG_SNAPSHOT=False, HISTORY_COMPACT_INTERVAL=0)
+    with app.app_context():
+        catalog = generate_catalog(
+            get_db(), args.movies, args.services, 1.5, args.history,
+            seed=args.seed, report=lambda message: print(message, file=sys.stderr)
+        )
+    close_pool(app)
+
+    urls = endpoint_urls(random.Random(args.seed), args.movies, args.requests)
+    results = {}
+    for workers in args.workers:
+        server, base_url = start_server(args.database, workers)
+        try:
+            results[workers] = {}
+            for name in READ_ENDPOINTS:
+                print(f"Benchmarking {name} with {workers} workers", file=sys.stderr)
+                results[workers][name] = measure(base_url, urls[name], args.clients, args.threads)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+    baseline = results[args.workers[0]]
+    for workers, endpoints in results.items():
+        for name, result in endpoints.items():
+            result["speedup"] = round(result["throughput_rps"] / baseline[name]["throughput_rps"], 2)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+        "catalog": catalog,
+        "load": {"requests": args.requests, "clients": args.clients, "threads": args.threads},
+        "workers": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Benchmark the API against a synthetic catalog.
+
+Generates a catalog, then drives every read endpoint twice: in-process
+through the Flask test client, and over HTTP from a multi-threaded load
+generator against a local threaded server. Latency percentiles, throughput
+and peak RSS are written as JSON so runs can be compared across commits.
+
+    python -m benchmarks.run --movies 100000 --history 500000 --output bench.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.catalog import generate_catalog, query_terms
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+def peak_rss_kb() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def misspell(rng: random.Random, term: str) -> str:
+    """Drop one inner character, a single edit"""
+    if len(term) < 4:
+        return term
+    position = rng.randint(1, len(term) - 2)
+    return term[:position] + term[position + 1:]
+
+def endpoint_urls(rng: random.Random, movies: int, count: int) -> Dict[str, List[str]]:
+    terms = query_terms(rng, count)
+    return {
+        "search": [f"/api/movies/search?q={term}&limit=50" for term in terms],
+        "fuzzy_search": [f"/api/movies/search?q={misspell(rng, term)}&fuzzy=1&limit=50" for term in terms],
+        "async_search": [f"/api/async/movies/search?q={term}&limit=50" for term in terms],
+        "trending": ["/api/movies/trending"] * count,
+        "movie": [f"/api/movies/{rng.randint(1, movies)}" for _ in range(count)],
+        "streaming": [f"/api/movies/{rng.randint(1, movies)}/streaming" for _ in range(count)],
+        "services": ["/api/services"] * count,
+    }
+
+def run_test_client(app, urls: List[str]) -> Dict:
+    client = app.test_client()
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for url in urls:
+        began = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - began)
+        errors += response.status_code >= 400
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def run_http(base_url: str, urls: List[str], threads: int) -> Dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def fetch(url: str):
+        nonlocal errors
+        began = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + url) as response:
+                response.read()
+            failed = False
+        except (urllib.error.URLError, OSError):
+            failed = True
+        elapsed = time.perf_counter() - began
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fetch, urls))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def serve(app) -> Tuple[str, Callable[[], None]]:
+    """Start a threaded local server on a free port; returns (base_url, shutdown)"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the movie API on a synthetic catalog")
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--services', type=int, default=8)
+    parser.add_argument('--density', type=float, default=1.5, help="Mean services per movie")
+    parser.add_argument('--history', type=int, default=50000, help="Search-history rows")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent for search history")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and mode")
+    parser.add_argument('--threads', type=int, default=8, help="HTTP load generator threads")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help="Database file; defaults to a temporary file")
+    parser.add_argument('--output', help="Write results JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.database is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database = os.path.join(tmpdir.name, 'bench.db')
+    # config reads DATABASE_PATH at import time, so set it before the app is imported
+    os.environ['DATABASE_PATH'] = args.database
+
+    from app import create_app
+    from app.services.database import close_pool, get_db
+    # Measure the endpoints themselves, not how many requests admission control sheds
+    app = create_app('production', ADMISSION_CONTROL=False)
+
+    with app.app_context():
+        catalog = generate_catalog(
+            get_db(), args.movies, args.services, args.density, args.history,
+            zipf_s=args.zipf, seed=args.seed, report=lambda message: print(message, file=sys.stderr)
+        )
+        # Publish the generated catalog now rather than at the next snapshot poll
+        holder = app.extensions.get('catalog_snapshot')
+        if holder is not None:
+            holder.refresh(get_db())
+
+    rng = random.Random(args.seed)
+    results = {}
+    base_url, shutdown = serve(app)
+    try:
+        for name, urls in endpoint_urls(rng, args.movies, args.requests).items():
+            print(f"Benchmarking {name}", file=sys.stderr)
+            results[name] = {
+                "test_client": run_test_client(app, urls),
+                "http": run_http(base_url, urls, args.threads),
+            }
+    finally:
+        shutdown()
+        close_pool(app)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "catalog": catalog,
+        "load": {"requests": args.requests, "threads": args.threads},
+        "endpoints": results,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark cold application startup.
+
+Each run starts a fresh interpreter that imports the app, calls create_app
+against an existing catalog and serves its first requests through the test
+client, timing each phase. The database is migrated and populated once up
+front, so runs measure a restart rather than a first deploy.
+
+    python -m benchmarks.startup --movies 100000 --runs 20 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.catalog import generate_catalog
+from benchmarks.run import git_commit, percentile
+
+FIRST_REQUESTS = {
+    "first_movie_ms": "/api/movies/1",
+    "first_search_ms": "/api/movies/search?q=the&limit=20",
+    "first_trending_ms": "/api/movies/trending",
+}
+
+def measure_child() -> Dict[str, float]:
+    """Time one startup in this process; meant to run in a fresh interpreter"""
+    timings = {}
+    started = time.perf_counter()
+    from app import create_app
+    timings["import_ms"] = (time.perf_counter() - started) * 1000
+
+    began = time.perf_counter()
+    app = create_app('production')
+    timings["create_app_ms"] = (time.perf_counter() - began) * 1000
+
+    client = app.test_client()
+    for name, url in FIRST_REQUESTS.items():
+        began = time.perf_counter()
+        response = client.get(url)
+        timings[name] = (time.perf_counter() - began) * 1000
+        if response.status_code >= 400:
+            raise SystemExit(f"{url} returned {response.status_code}")
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+def run_once(database: str) -> Dict[str, float]:
+    env = dict(os.environ, DATABASE_PATH=database)
+    began = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child'],
+        env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - began) * 1000
+    return timings
+
+def summarize_runs(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for name in runs[0]:
+        values = sorted(run[name] for run in runs)
+        summary[name] = {
+            "p50": round(percentile(values, 0.50), 3),
+            "p95": round(percentile(values, 0.95), 3),
+            "max": round(values[-1], 3),
+        }
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold create_app and first-request latency")
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--services', type=int, default=8)
+    parser.add_argument('--history', type=int, default=50000, help="Search-history rows")
+    parser.add_argument('--runs', type=int, default=10, help="Fresh processes to start")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help="Database file; defaults to a temporary file")
+    parser.add_argument('--output', help="Write results JSON here instead of stdout")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_child()))
+        return
+
+    tmpdir = None
+    if args.database is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database = os.path.join(tmpdir.name, 'startup.db')
+
+    # config reads DATABASE_PATH at import time; children then find an up-to-date schema
+    os.environ['DATABASE_PATH'] = args.database
+    from app import create_app
+    from app.services.database import close_pool, get_db
+    app = create_app('production')
+    with app.app_context():
+        catalog = generate_catalog(
+            get_db(), args.movies, args.services, 1.5, args.history,
+            seed=args.seed, report=lambda message: print(message, file=sys.stderr)
+        )
+    close_pool(app)
+
+    runs = []
+    for number in range(args.runs):
+        print(f"Startup run {number + 1}/{args.runs}", file=sys.stderr)
+        runs.append(run_once(args.database))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "catalog": catalog,
+        "runs": args.runs,
+        "startup": summarize_runs(runs),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+if __name__ == '__main__':
+    main()
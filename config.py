@@ -4,6 +4,56 @@ class Config:
     DATABASE = os.getenv('DATABASE_PATH', 'movie_streaming.db')
     TESTING = False
     DEBUG = False
+    DB_POOL_SIZE = 8
+    DB_POOL_TIMEOUT = 5.0  # seconds to wait for a free connection
+    DB_CACHED_STATEMENTS = 256
+    DB_JOURNAL_MODE = 'WAL'
+    DB_SYNCHRONOUS = 'NORMAL'
+    DB_BUSY_TIMEOUT_MS = 5000
+    DB_CACHE_SIZE = -65536  # negative values are KiB, so 64 MiB per connection
+    DB_MMAP_SIZE = 256 * 1024 * 1024
+    DB_READ_ONLY = False  # open request connections through a mode=ro URI, as prefork workers do
+    SQL_INSTRUMENTATION = True  # time every statement for /api/metrics
+    SERVER_TIMING = False  # add a Server-Timing header to every response
+    CATALOG_CACHE_CONTROL = 'public, max-age=60'  # sent with ETagged catalog responses
+    CATALOG_SNAPSHOT = True  # serve movie and service lookups from an in-memory copy
+    CATALOG_SNAPSHOT_REFRESH = 5.0  # seconds between version checks; 0 checks on every read
+    API_DEFAULT_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 500
+    API_MAX_BATCH_SIZE = 500  # ids per /api/movies batch lookup
+    ASYNC_API = True  # also serve the API from async views under /api/async
+    ASYNC_DB_WORKERS = 8  # executor threads, each with its own connection
+    ASYNC_DB_MAX_IN_FLIGHT = 64  # queued plus running calls per process; more answer 503
+    SEARCH_USE_FTS = True
+    SEARCH_CACHE_SIZE = 1024  # 0 disables the search result cache
+    SEARCH_CACHE_TTL = 30.0  # seconds
+    FUZZY_SEARCH_LIMIT = 20  # results for fuzzy=1 searches without a limit
+    FUZZY_CANDIDATES = 200  # close title words re-ranked by edit distance, per query word
+    JSON_FRAGMENT_CACHE_SIZE = 50000  # encoded movie payloads; 0 disables
+    SUGGEST_LIMIT = 10
+    SUGGEST_REFRESH = 300.0  # seconds before popularity weights are reloaded
+    HISTORY_ASYNC = True
+    HISTORY_BATCH_SIZE = 500
+    HISTORY_FLUSH_INTERVAL = 1.0
+    HISTORY_QUEUE_SIZE = 10000
+    HISTORY_OVERFLOW_POLICY = 'drop'  # 'drop' or 'sample'
+    HISTORY_SAMPLE_RATE = 0.1
+    HISTORY_RETENTION_HOURS = 24 * 7  # raw rows kept before rollup into daily counts; 0 keeps them all
+    HISTORY_COMPACT_INTERVAL = 3600.0  # seconds between background compaction runs; 0 disables them
+    HISTORY_COMPACT_BATCH = 5000  # rows per compaction transaction
+    HISTORY_SHARDS = 0  # spread search history over this many SQLite files by movie id; 0 keeps it in DATABASE
+    TRENDING_HALF_LIFE_HOURS = 24
+    PREFORK_WORKERS = 0  # serve.py worker processes; 0 starts one per CPU
+    ADMISSION_CONTROL = True  # answer 429/503 at once when an endpoint class is over its limits
+    # Per process and request class: (concurrent requests, requests per second, burst); None disables a limit.
+    # Search and health requests each hold a pooled connection, so their limits add up to less than DB_POOL_SIZE;
+    # lookups mostly read the catalog snapshot and /api/async runs SQL on its own executor.
+    ADMISSION_LIMITS = {
+        'search': (5, 200.0, 400),
+        'health': (2, None, None),
+        'lookup': (64, None, None),
+        'async': (64, None, None),
+    }
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -11,6 +61,9 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     DATABASE = 'test_movie_streaming.db'
+    HISTORY_ASYNC = False
+    CATALOG_SNAPSHOT_REFRESH = 0
+    HISTORY_COMPACT_INTERVAL = 0
 
 class ProductionConfig(Config):
     pass
@@ -1,5 +1,7 @@
 import sqlite3
 from sqlite3 import Error
+from app.services.ingest import CatalogLoader
+from app.services.migrations import migrate
 
 # Sample data
 MOVIES = [
@@ -44,35 +46,7 @@ MOVIE_STREAMING_RELATIONS = [
 def create_database():
     try:
         connection = sqlite3.connect('movie_streaming.db')
-        cursor = connection.cursor()
-        
-        # Create Movies table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Movies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                release_year INTEGER NOT NULL
-            )
-        """)
-        
-        # Create Streaming_Services table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Streaming_Services (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                service_name TEXT NOT NULL UNIQUE
-            )
-        """)
-        
-        # Create Movie_Streamings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Movie_Streamings (
-                movie_id INTEGER,
-                service_id INTEGER,
-                PRIMARY KEY (movie_id, service_id),
-                FOREIGN KEY (movie_id) REFERENCES Movies(id),
-                FOREIGN KEY (service_id) REFERENCES Streaming_Services(id)
-            )
-        """)
+        migrate(connection)  # Same schema, triggers and indexes as the app
         
         print("Database and tables created successfully")
         return connection
@@ -93,22 +67,24 @@ def populate_database(connection):
         # Reset auto-increment counters
         cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('Movies', 'Streaming_Services')")
         
-        # Insert Movies
-        movie_insert_query = "INSERT INTO Movies (title, release_year) VALUES (?, ?)"
-        cursor.executemany(movie_insert_query, MOVIES)
-        
-        # Insert Streaming Services
-        service_insert_query = "INSERT INTO Streaming_Services (service_name) VALUES (?)"
-        cursor.executemany(service_insert_query, [(service,) for service in STREAMING_SERVICES])
-        
-        # Insert Movie-Streaming relationships
-        relation_insert_query = """
-            INSERT INTO Movie_Streamings (movie_id, service_id)
-            SELECT 
-                (SELECT id FROM Movies LIMIT 1 OFFSET ?),
-                (SELECT id FROM Streaming_Services LIMIT 1 OFFSET ?)
-        """
-        cursor.executemany(relation_insert_query, MOVIE_STREAMING_RELATIONS)
+        connection.commit()
+
+        # Load through the bulk loader, which resolves relations by natural key
+        with CatalogLoader(connection, report=lambda message: None) as loader:
+            loader.load_movies(
+                {"title": title, "release_year": year} for title, year in MOVIES
+            )
+            loader.load_services(
+                {"service_name": service} for service in STREAMING_SERVICES
+            )
+            loader.load_availability(
+                {
+                    "title": MOVIES[movie_index][0],
+                    "release_year": MOVIES[movie_index][1],
+                    "service_name": STREAMING_SERVICES[service_index],
+                }
+                for movie_index, service_index in MOVIE_STREAMING_RELATIONS
+            )
         
         connection.commit()
         print("Data inserted successfully")
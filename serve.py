@@ -0,0 +1,26 @@
+"""Production entry point: serve the app from forked worker processes.
+
+Workers share one listening socket and read the catalog over read-only,
+memory-mapped SQLite connections; a single writer process records search
+history. Unix only.
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import logging
+
+from app.services.prefork import PreforkServer
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the movie API from forked worker processes")
+    parser.add_argument('--config', default='production', help="Configuration name from config.py")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes; 0 uses PREFORK_WORKERS")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(process)d %(levelname)s %(message)s')
+    PreforkServer(args.config, args.host, args.port, args.workers).serve_forever()
+
+if __name__ == '__main__':
+    main()
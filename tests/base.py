@@ -1,7 +1,18 @@
+import re
 import unittest
 import sqlite3
+from contextlib import contextmanager
 from app import create_app
-from app.services.database import get_db
+from app.services.database import close_pool, get_db
+from app.services.db_executor import close_db_executor
+from app.services.history_rollup import close_history_compactor
+from app.services.history_shards import close_history_shards
+from app.services.snapshot import close_snapshot
+
+# Single-row and per-window bookkeeping tables that are fine to scan
+SMALL_TABLES = ('Catalog_Version', 'Services_Version', 'Trending_Windows', 'Trending_Decay')
+
+_FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?! VIRTUAL TABLE)')
 
 class BaseTestCase(unittest.TestCase):
     def setUp(self):
@@ -17,41 +28,42 @@ class BaseTestCase(unittest.TestCase):
     def tearDown(self):
         """Clean up after each test"""
         self.app_context.pop()
+        close_snapshot(self.app)
+        close_db_executor(self.app)
+        close_history_compactor(self.app)
+        close_history_shards(self.app)
+        close_pool(self.app)
     
+    @contextmanager
+    def captured_statements(self):
+        """Collect every statement run on this test's connection, with parameters inlined"""
+        statements = []
+        db = get_db()
+        db.set_trace_callback(statements.append)
+        try:
+            yield statements
+        finally:
+            db.set_trace_callback(None)
+
+    def assertNoFullScans(self, statements, allow=()):
+        """Fail if EXPLAIN QUERY PLAN shows a full scan of any table but SMALL_TABLES.
+
+        allow lists SQL fragments of statements whose scans are known to be bounded.
+        """
+        db = get_db()
+        for sql in dict.fromkeys(statements):
+            if not sql.lstrip().upper().startswith('SELECT') or any(fragment in sql for fragment in allow):
+                continue
+            for row in db.execute("EXPLAIN QUERY PLAN " + sql):
+                scan = _FULL_SCAN_RE.match(row[3])
+                if scan and scan.group(1) not in SMALL_TABLES:
+                    self.fail(f"Full scan ({row[3]}) in: {' '.join(sql.split())}")
+
     def _init_test_db(self):
         """Initialize test database with sample data"""
         conn = get_db()
         cursor = conn.cursor()
         
-        # Create tables
-        cursor.executescript("""
-            CREATE TABLE IF NOT EXISTS Movies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                release_year INTEGER NOT NULL
-            );
-            
-            CREATE TABLE IF NOT EXISTS Streaming_Services (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                service_name TEXT NOT NULL UNIQUE
-            );
-            
-            CREATE TABLE IF NOT EXISTS Movie_Streamings (
-                movie_id INTEGER,
-                service_id INTEGER,
-                PRIMARY KEY (movie_id, service_id),
-                FOREIGN KEY (movie_id) REFERENCES Movies(id),
-                FOREIGN KEY (service_id) REFERENCES Streaming_Services(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS Movie_Search_History (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                movie_id INTEGER NOT NULL,
-                search_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (movie_id) REFERENCES Movies(id)
-            );
-        """)
-        
         # Clear existing data
         cursor.executescript("""
             DELETE FROM Movie_Search_History;
@@ -59,6 +71,8 @@ class BaseTestCase(unittest.TestCase):
             DELETE FROM Movies;
             DELETE FROM Streaming_Services;
             DELETE FROM sqlite_sequence;
+            DELETE FROM Search_History_Daily;
+            UPDATE History_Rollup SET rolled_through = 0;
         """)
         
         # Insert test data
@@ -89,40 +103,16 @@ class BaseTestCase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """Set up any necessary test fixtures before running tests"""
-        # Ensure test database is created
+        # Ensure test database is created; create_app applies the schema migrations
         app = create_app('testing')
-        with app.app_context():
-            conn = get_db()
-            cursor = conn.cursor()
-            
-            # Create tables
-            cursor.executescript("""
-                CREATE TABLE IF NOT EXISTS Movies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    release_year INTEGER NOT NULL
-                );
-                
-                CREATE TABLE IF NOT EXISTS Streaming_Services (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    service_name TEXT NOT NULL UNIQUE
-                );
-                
-                CREATE TABLE IF NOT EXISTS Movie_Streamings (
-                    movie_id INTEGER,
-                    service_id INTEGER,
-                    PRIMARY KEY (movie_id, service_id),
-                    FOREIGN KEY (movie_id) REFERENCES Movies(id),
-                    FOREIGN KEY (service_id) REFERENCES Streaming_Services(id)
-                );
-            """)
-            conn.commit()
+        close_pool(app)
     
     @classmethod
     def tearDownClass(cls):
         """Clean up any test fixtures after running tests"""
         import os
-        try:
-            os.remove('test_movie_streaming.db')
-        except OSError:
-            pass 
\ No newline at end of file
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove('test_movie_streaming.db' + suffix)
+            except OSError:
+                pass 
\ No newline at end of file
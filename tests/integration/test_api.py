@@ -1,5 +1,9 @@
 from tests.base import BaseTestCase
+from app import create_app
+from app.services.database import close_pool, get_db
+from app.services.snapshot import SnapshotHolder, close_snapshot
 import json
+import time
 
 class TestAPIEndpoints(BaseTestCase):
     def test_health_check(self):
@@ -23,6 +27,133 @@ class TestAPIEndpoints(BaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(data['results']), 1)
     
+    def test_search_service_filters(self):
+        """Test comma-separated services, service_match and year ranges"""
+        response = self.client.get('/api/movies/search?q=Movie&service=Netflix,Amazon%20Prime&service_match=all')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['title'] for m in data['results']], ['Test Movie 1'])
+        self.assertEqual(data['filters']['service_match'], 'all')
+
+        data = json.loads(self.client.get('/api/movies/search?q=Movie&year_from=2020&year_to=2021').data)
+        self.assertEqual(data['count'], 2)
+
+        response = self.client.get('/api/movies/search?q=Movie&service=Netflix&service_match=some')
+        self.assertEqual(response.status_code, 400)
+
+    def test_fuzzy_search(self):
+        """Test fuzzy=1 finds misspelled titles that exact search misses"""
+        self.assertEqual(json.loads(self.client.get('/api/movies/search?q=Anothr').data)['count'], 0)
+        data = json.loads(self.client.get('/api/movies/search?q=Anothr&fuzzy=1').data)
+        self.assertTrue(data['fuzzy'])
+        self.assertEqual([m['title'] for m in data['results']], ['Another Movie'])
+
+        data = json.loads(self.client.get('/api/movies/search?q=Tesst&fuzzy=1&limit=1').data)
+        self.assertEqual([m['title'] for m in data['results']], ['Test Movie 1'])
+        response = self.client.get('/api/movies/search?q=Tesst&fuzzy=1&cursor=abc')
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_api_matches_sync(self):
+        """Test the async blueprint answers like the sync one"""
+        for path in ('/movies/search?q=Test&service=netflix', '/movies/search?q=Tesst&fuzzy=1',
+                     '/movies?ids=2,999,1',
+                     '/movies/1/streaming', '/movies/trending', '/services'):
+            sync_data = json.loads(self.client.get('/api' + path).data)
+            response = self.client.get('/api/async' + path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(json.loads(response.data), sync_data, path)
+        self.assertEqual(self.client.get('/api/async/movies/999').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/movies/search?q=a').status_code, 400)
+
+    def test_async_home(self):
+        """Test the combined home response gathers trending, services and search"""
+        data = json.loads(self.client.get('/api/async/home?q=Another').data)
+        self.assertEqual(data['trending']['results'][0]['title'], 'Test Movie 1')
+        self.assertEqual(data['services'], ['Amazon Prime', 'Netflix'])
+        self.assertEqual([m['title'] for m in data['search']['results']], ['Another Movie'])
+        self.assertIsNone(json.loads(self.client.get('/api/async/home').data)['search'])
+
+    def test_async_sql_metrics(self):
+        """Test SQL run on the executor is charged to the async request"""
+        self.app.config['SERVER_TIMING'] = True
+        header = self.client.get('/api/async/movies/trending').headers['Server-Timing']
+        self.assertRegex(header, r'desc="[1-9]\d* queries"')
+
+    def test_async_api_sheds_load(self):
+        """Test a saturated executor answers 503 with Retry-After"""
+        self.app.config['ASYNC_DB_MAX_IN_FLIGHT'] = 0
+        response = self.client.get('/api/async/movies/trending')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_admission_reserves_capacity(self):
+        """Test saturated searches answer 503 at once while lookups and health checks still run"""
+        search = self.app.extensions['admission'].classes['search']
+        for _ in range(search.max_concurrent):
+            search.admit()
+        try:
+            response = self.client.get('/api/movies/search?q=Test')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+            self.assertEqual(self.client.get('/api/movies/1').status_code, 200)
+            self.assertEqual(self.client.get('/api/health').status_code, 200)
+        finally:
+            search.in_flight = 0
+        self.assertEqual(self.client.get('/api/movies/search?q=Test').status_code, 200)
+        self.assertIn('movieapp_admission{name="search_over_capacity"} 1', self.client.get('/api/metrics').data.decode())
+
+    def test_admission_rate_limit(self):
+        """Test a class past its token bucket answers 429 with Retry-After"""
+        app = create_app('testing', ADMISSION_LIMITS=dict(self.app.config['ADMISSION_LIMITS'], search=(3, 0.5, 2)))
+        client = app.test_client()
+        try:
+            self.assertEqual([client.get('/api/movies/search?q=Test').status_code for _ in range(2)], [200, 200])
+            response = client.get('/api/movies/search?q=Test')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers['Retry-After'], '2')
+            self.assertEqual(client.get('/api/movies/1').status_code, 200)
+        finally:
+            close_snapshot(app)
+            close_pool(app)
+
+    def test_suggest_endpoint(self):
+        """Test typeahead suggestions are ranked and record no history"""
+        db = get_db()
+        history = lambda: db.execute("SELECT COUNT(*) FROM Movie_Search_History").fetchone()[0]
+        before = history()
+        response = self.client.get('/api/movies/suggest?q=mov&limit=2')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['suggestions'], [
+            {"id": 1, "title": "Test Movie 1"},
+            {"id": 2, "title": "Test Movie 2"}
+        ])
+        self.assertEqual(history(), before)
+
+    def test_batch_lookup(self):
+        """Test GET and POST batch lookups keep request order and report missing ids"""
+        response = self.client.get('/api/movies?ids=2,999,1,2')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['id'] for m in data['results']], [2, 1])
+        self.assertEqual(data['results'][1]['streaming_services'], ['Netflix', 'Amazon Prime'])
+        self.assertEqual(data['missing'], [999])
+
+        response = self.client.post('/api/movies', json={"ids": [3, 1]})
+        data = json.loads(response.data)
+        self.assertEqual([m['title'] for m in data['results']], ['Another Movie', 'Test Movie 1'])
+        self.assertEqual(data['results'][0]['streaming_services'], [])
+
+        self.assertEqual(self.client.get('/api/movies?ids=1,abc').status_code, 400)
+        self.assertEqual(self.client.post('/api/movies', json={"ids": "1"}).status_code, 400)
+        self.app.config['API_MAX_BATCH_SIZE'] = 2
+        self.assertEqual(self.client.get('/api/movies?ids=1,2,3').status_code, 400)
+
+    def test_batch_lookup_constant_query_count(self):
+        """Test batch lookups cost a fixed number of queries without the snapshot"""
+        self.app.extensions.pop('catalog_snapshot')
+        self.assertEqual(self._count_selects('/api/movies?ids=1'), self._count_selects('/api/movies?ids=1,2,3'))
+
     def test_get_movie(self):
         """Test getting a specific movie"""
         response = self.client.get('/api/movies/1')
@@ -39,4 +170,141 @@ class TestAPIEndpoints(BaseTestCase):
         response = self.client.get('/api/movies/1/streaming')
         data = json.loads(response.data)
         self.assertEqual(response.status_code, 200)
-        self.assertIn('Netflix', data['streaming_services']) 
\ No newline at end of file
+        self.assertIn('Netflix', data['streaming_services'])
+
+    def _count_selects(self, url):
+        statements = []
+        db = get_db()
+        db.set_trace_callback(statements.append)
+        try:
+            response = self.client.get(url)
+        finally:
+            db.set_trace_callback(None)
+        self.assertEqual(response.status_code, 200)
+        return len([s for s in statements if s.lstrip().upper().startswith('SELECT')])
+
+    def test_list_endpoints_constant_query_count(self):
+        """Test list endpoints load streaming services in bulk"""
+        # Prime once-per-process work such as trending window refresh
+        self.client.get('/api/movies/trending')
+        small_search = self._count_selects('/api/movies/search?q=Test')
+        small_trending = self._count_selects('/api/movies/trending')
+
+        db = get_db()
+        db.executemany(
+            "INSERT INTO Movies (title, release_year) VALUES (?, ?)",
+            [(f'Test Bulk {i}', 2000 + i % 20) for i in range(50)]
+        )
+        db.executemany(
+            "INSERT INTO Movie_Streamings (movie_id, service_id) VALUES (?, 1)",
+            [(movie_id,) for movie_id in range(4, 54)]
+        )
+        db.commit()
+        self.client.get('/api/services')  # Rebuild the catalog snapshot once
+
+        self.assertEqual(self._count_selects('/api/movies/search?q=Test'), small_search)
+        self.assertEqual(self._count_selects('/api/movies/trending'), small_trending)
+
+    def test_trending_windows(self):
+        """Test trending counters per window"""
+        response = self.client.get('/api/movies/trending?window=day')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['view_count'] for m in data['results'][:3]], [3, 2, 1])
+
+        for _ in range(3):
+            self.client.get('/api/movies/search?q=Another')
+        data = json.loads(self.client.get('/api/movies/trending?window=hour').data)
+        self.assertEqual(data['results'][0]['title'], 'Another Movie')
+        self.assertEqual(data['results'][0]['view_count'], 4)
+
+        data = json.loads(self.client.get('/api/movies/trending?window=decay').data)
+        self.assertEqual(data['results'][0]['title'], 'Another Movie')
+        self.assertAlmostEqual(data['results'][0]['view_count'], 4.0)
+
+        response = self.client.get('/api/movies/trending?window=year')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_pagination(self):
+        """Test keyset pagination walks search results in title order"""
+        titles = []
+        url = '/api/movies/search?q=Movie&limit=2'
+        while url:
+            data = json.loads(self.client.get(url).data)
+            titles.extend(movie['title'] for movie in data['results'])
+            url = data['next_cursor'] and f"/api/movies/search?q=Movie&limit=2&cursor={data['next_cursor']}"
+        self.assertEqual(titles, ['Another Movie', 'Test Movie 1', 'Test Movie 2'])
+
+        response = self.client.get('/api/movies/search?q=Movie&cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/movies/search?q=Movie&limit=0')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_stream(self):
+        """Test streamed search responses match the buffered body"""
+        streamed = json.loads(self.client.get('/api/movies/search?q=Movie&stream=1&limit=2').data)
+        buffered = json.loads(self.client.get('/api/movies/search?q=Movie&limit=2').data)
+        self.assertEqual(streamed['results'], buffered['results'])
+        self.assertEqual(streamed['count'], 2)
+        self.assertIsNotNone(streamed['next_cursor'])
+
+    def test_trending_pagination(self):
+        """Test keyset pagination over trending counters"""
+        data = json.loads(self.client.get('/api/movies/trending?limit=2').data)
+        self.assertEqual([m['title'] for m in data['results']], ['Test Movie 1', 'Test Movie 2'])
+        data = json.loads(self.client.get(f"/api/movies/trending?limit=2&cursor={data['next_cursor']}").data)
+        self.assertEqual([m['title'] for m in data['results']], ['Another Movie'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_conditional_get(self):
+        """Test catalog reads carry ETags and answer If-None-Match with 304"""
+        for url in ('/api/movies/1', '/api/movies/1/streaming', '/api/services'):
+            response = self.client.get(url)
+            etag = response.headers['ETag']
+            self.assertIn('max-age', response.headers['Cache-Control'])
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+
+        etag = self.client.get('/api/movies/1').headers['ETag']
+        other = self.client.get('/api/movies/2').headers['ETag']
+        db = get_db()
+        db.execute("DELETE FROM Movie_Streamings WHERE movie_id = 1 AND service_id = 2")
+        db.commit()
+        self.assertEqual(self.client.get('/api/movies/1', headers={'If-None-Match': etag}).status_code, 200)
+        self.assertEqual(self.client.get('/api/movies/2', headers={'If-None-Match': other}).status_code, 304)
+
+        db.execute("UPDATE Streaming_Services SET service_name = 'Prime Video' WHERE id = 2")
+        db.commit()
+        self.assertEqual(self.client.get('/api/movies/2', headers={'If-None-Match': other}).status_code, 200)
+
+    def test_snapshot_reads_skip_sql(self):
+        """Test lookups are served from a background-refreshed snapshot without SQL"""
+        holder = SnapshotHolder(self.app.config['DATABASE'], refresh_interval=60)
+        self.app.extensions['catalog_snapshot'] = holder
+        deadline = time.monotonic() + 5
+        while holder.snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        for url in ('/api/movies/1', '/api/movies/1/streaming', '/api/services'):
+            self.assertEqual(self._count_selects(url), 0)
+        data = json.loads(self.client.get('/api/movies/1/streaming').data)
+        self.assertEqual(data['streaming_services'], ['Netflix', 'Amazon Prime'])
+
+    def test_metrics_endpoint(self):
+        """Test per-request SQL and latency metrics are exported"""
+        self.client.get('/api/movies/1')
+        response = self.client.get('/api/metrics')
+        body = response.data.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('movieapp_http_requests_total{endpoint="api.get_movie",status="200"} 1', body)
+        self.assertIn('movieapp_http_request_duration_seconds_bucket{endpoint="api.get_movie",le="+Inf"} 1', body)
+        self.assertIn('statement="SELECT version FROM Catalog_Version WHERE id = 1"', body)
+        self.assertIn('movieapp_db_pool{name="checkouts"}', body)
+
+    def test_server_timing_header(self):
+        """Test the optional Server-Timing header"""
+        self.assertNotIn('Server-Timing', self.client.get('/api/health').headers)
+        self.app.config['SERVER_TIMING'] = True
+        header = self.client.get('/api/movies/1').headers['Server-Timing']
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
\ No newline at end of file
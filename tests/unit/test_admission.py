@@ -0,0 +1,44 @@
+from tests.base import BaseTestCase
+from app.services.admission import AdmissionControl, RequestClass, TokenBucket
+
+class TestAdmission(BaseTestCase):
+    def test_token_bucket_refills_at_rate(self):
+        """Test a bucket allows its burst, then one request per 1/rate seconds"""
+        now = [0.0]
+        bucket = TokenBucket(rate=2.0, burst=3, clock=lambda: now[0])
+        self.assertEqual([bucket.take() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.take(), 0.5)
+        now[0] = 0.5
+        self.assertEqual(bucket.take(), 0.0)
+        now[0] = 100.0
+        self.assertEqual([bucket.take() for _ in range(4)].count(0.0), 3)
+
+    def test_concurrency_limit_rejects_without_queueing(self):
+        """Test a full class rejects with 503 and admits again once a slot is released"""
+        limiter = RequestClass('search', max_concurrent=2)
+        self.assertIsNone(limiter.admit())
+        self.assertIsNone(limiter.admit())
+        self.assertEqual(limiter.admit(), (503, 1.0))
+        limiter.release()
+        self.assertIsNone(limiter.admit())
+        self.assertEqual((limiter.in_flight, limiter.over_capacity), (2, 1))
+
+    def test_endpoints_map_to_classes(self):
+        """Test searches, lookups, health checks and async requests are limited separately, web pages not at all"""
+        admission = AdmissionControl({'search': (1, None, None), 'lookup': (1, None, None),
+                                      'health': (1, None, None), 'async': (1, None, None)}, pool_size=3)
+        self.assertEqual(admission.request_class('api.search_movies', 'api').name, 'search')
+        self.assertEqual(admission.request_class('api_async.search_movies', 'api_async').name, 'async')
+        self.assertEqual(admission.request_class('api.get_movie', 'api').name, 'lookup')
+        self.assertEqual(admission.request_class('api.health_check', 'api').name, 'health')
+        self.assertIsNone(admission.request_class('web.root', 'web'))
+
+    def test_limits_fit_connection_pool(self):
+        """Test only the classes holding pooled connections are bounded by the pool, with one to spare"""
+        with self.assertRaises(ValueError):
+            AdmissionControl({'search': (None, 10.0, 10), 'health': (1, None, None)}, 8)
+        with self.assertRaises(ValueError):
+            AdmissionControl({'search': (6, None, None), 'health': (2, None, None)}, 8)
+        AdmissionControl({'search': (6, None, None), 'health': (1, None, None),
+                          'lookup': (100, None, None), 'async': (None, None, None)}, 8)
+        AdmissionControl(self.app.config['ADMISSION_LIMITS'], self.app.config['DB_POOL_SIZE'])
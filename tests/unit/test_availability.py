@@ -0,0 +1,53 @@
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.availability import availability_mismatches, decode, rebuild_availability
+from app.services.database import get_db
+
+class TestAvailability(BaseTestCase):
+    def _availability(self, movie_id):
+        row = get_db().execute("SELECT availability FROM Movies WHERE id = ?", (movie_id,)).fetchone()
+        return decode(row[0])
+
+    def test_fixture_is_consistent(self):
+        """Test the column matches Movie_Streamings after ordinary inserts"""
+        self.assertEqual(self._availability(1), ['Netflix', 'Amazon Prime'])
+        self.assertEqual(self._availability(3), [])
+        self.assertEqual(list(availability_mismatches(get_db())), [])
+
+    def test_triggers_follow_streamings_and_services(self):
+        """Test adding, moving and removing availability and renaming or deleting services"""
+        db = get_db()
+        db.execute("INSERT INTO Movie_Streamings (movie_id, service_id) VALUES (3, 2)")
+        self.assertEqual(self._availability(3), ['Amazon Prime'])
+        db.execute("UPDATE Movie_Streamings SET movie_id = 2 WHERE movie_id = 3")
+        self.assertEqual((self._availability(2), self._availability(3)), (['Netflix', 'Amazon Prime'], []))
+        db.execute("DELETE FROM Movie_Streamings WHERE movie_id = 2 AND service_id = 1")
+        self.assertEqual(self._availability(2), ['Amazon Prime'])
+        db.execute("UPDATE Streaming_Services SET service_name = 'Prime Video' WHERE id = 2")
+        self.assertEqual(self._availability(1), ['Netflix', 'Prime Video'])
+        db.execute("DELETE FROM Streaming_Services WHERE id = 1")
+        self.assertEqual(self._availability(1), ['Prime Video'])
+        db.commit()
+        self.assertEqual(list(availability_mismatches(db)), [])
+
+    def test_rebuild_repairs_stale_rows(self):
+        """Test the checker finds rows written around the triggers and the rebuild fixes them"""
+        db = get_db()
+        db.execute("UPDATE Movies SET availability = 'Stale' WHERE id IN (1, 3)")
+        self.assertEqual([movie_id for movie_id, _ in availability_mismatches(db, chunk_size=1)], [1, 3])
+        self.assertEqual(rebuild_availability(db, chunk_size=1), 2)
+        db.commit()
+        self.assertEqual(list(availability_mismatches(db)), [])
+        self.assertEqual(self._availability(1), ['Netflix', 'Amazon Prime'])
+
+    def test_search_reads_availability_from_movies(self):
+        """Test search, lookups and trending serialize services without joining Movie_Streamings"""
+        self.app.extensions.pop('catalog_snapshot').close()
+        with self.captured_statements() as statements:
+            searched = {movie.id: movie.streaming_services for movie in Movie.search("Test")}
+            looked_up = Movie.get_by_id(1).streaming_services
+            trending = {movie.id: movie.streaming_services for movie in Movie.get_trending()}
+        self.assertEqual(searched[1], ['Netflix', 'Amazon Prime'])
+        self.assertEqual(looked_up, ['Netflix', 'Amazon Prime'])
+        self.assertEqual(trending[2], ['Netflix'])
+        self.assertFalse([sql for sql in statements if 'Movie_Streamings' in sql])
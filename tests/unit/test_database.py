@@ -0,0 +1,31 @@
+from tests.base import BaseTestCase
+from app.services.database import ConnectionPool, PoolTimeout, get_db
+
+class TestConnectionPool(BaseTestCase):
+    def test_connections_are_reused(self):
+        """Test released connections are handed out again instead of reconnecting"""
+        pool = ConnectionPool(self.app.config['DATABASE'])
+        for _ in range(3):
+            pool.release(pool.acquire())
+        stats = pool.stats()
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['checkouts'], 3)
+        pool.close()
+
+    def test_pragmas_applied(self):
+        """Test pooled connections are configured with the tuned pragmas"""
+        db = get_db()
+        self.assertEqual(db.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(db.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+        self.assertEqual(db.execute("PRAGMA synchronous").fetchone()[0], 1)
+
+    def test_exhausted_pool_times_out(self):
+        """Test checkout waits are counted and bounded by the timeout"""
+        pool = ConnectionPool(self.app.config['DATABASE'], size=1, timeout=0.01)
+        conn = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['waits'], 1)
+        pool.close()
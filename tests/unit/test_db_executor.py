@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from tests.base import BaseTestCase
+from app.services.database import get_db
+from app.services.db_executor import DatabaseBusy, DatabaseExecutor
+
+class TestDatabaseExecutor(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = DatabaseExecutor(self.app, workers=2, max_in_flight=2)
+
+    def tearDown(self):
+        self.executor.close()
+        super().tearDown()
+
+    def test_calls_run_concurrently_on_own_connections(self):
+        """Test gathered calls overlap and each gets a connection outside the sync pool"""
+        barrier = threading.Barrier(2, timeout=5)
+        test_db = get_db()
+
+        def count_movies():
+            barrier.wait()  # Breaks unless both calls are running at once
+            db = get_db()
+            self.assertIsNot(db, test_db)
+            return db.execute("SELECT COUNT(*) FROM Movies").fetchone()[0]
+
+        async def both():
+            return await asyncio.gather(self.executor.run(count_movies), self.executor.run(count_movies))
+
+        self.assertEqual(asyncio.run(both()), [3, 3])
+        self.assertEqual(self.executor.stats()['in_flight'], 0)
+
+    def test_rejects_beyond_max_in_flight(self):
+        """Test calls past max_in_flight raise DatabaseBusy instead of queueing"""
+        release = threading.Event()
+
+        async def saturate():
+            blocked = [asyncio.ensure_future(self.executor.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0)
+            try:
+                with self.assertRaises(DatabaseBusy):
+                    await self.executor.run(get_db)
+            finally:
+                release.set()
+                await asyncio.gather(*blocked)
+
+        asyncio.run(saturate())
+        self.assertEqual(self.executor.stats()['rejected'], 1)
@@ -0,0 +1,49 @@
+import random
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.database import get_db
+from app.services.fuzzy import TrigramIndex, edit_distance, get_trigram_index
+
+def _levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class TestTrigramIndex(BaseTestCase):
+    def test_edit_distance(self):
+        """Test the bit-parallel distance agrees with the textbook dynamic program"""
+        rng = random.Random(7)
+        for _ in range(2000):
+            a = ''.join(rng.choice('abc ') for _ in range(rng.randint(0, 10)))
+            b = ''.join(rng.choice('abc ') for _ in range(rng.randint(0, 10)))
+            self.assertEqual(edit_distance(a, b), _levenshtein(a, b), (a, b))
+
+    def test_misspelled_titles(self):
+        """Test misspelled words find their titles, closest and then alphabetical first"""
+        index = TrigramIndex([
+            (1, 'Interstellar'), (2, 'The Shawshank Redemption'), (3, 'Inception'),
+            (4, 'The Dark Knight'), (5, 'Dark Waters')
+        ], version=0)
+        self.assertEqual(index.search('Interstelar'), [(1, 1)])
+        self.assertEqual(index.search('shawshenk'), [(2, 1)])
+        self.assertEqual(index.search('dark knigt'), [(4, 1)])
+        self.assertEqual(index.search('drak'), [])  # A transposition is two edits
+        self.assertEqual(index.search('darkk'), [(5, 1), (4, 1)])
+        self.assertEqual(index.search('darkk', limit=1), [(5, 1)])
+        self.assertEqual(index.search('zzzz'), [])
+
+    def test_fuzzy_search_follows_catalog(self):
+        """Test fuzzy search applies filters and sees new titles"""
+        self.assertEqual([m.title for m in Movie.fuzzy_search('Tesst Movie')], ['Test Movie 1', 'Test Movie 2'])
+        self.assertEqual([m.title for m in Movie.fuzzy_search('Tesst Movie', service='amazon prime')],
+                         ['Test Movie 1'])
+
+        db = get_db()
+        db.execute("INSERT INTO Movies (title, release_year) VALUES ('Interstellar', 2014)")
+        db.commit()
+        self.assertEqual([m.title for m in Movie.fuzzy_search('interstelar')], ['Interstellar'])
+        self.assertIs(get_trigram_index(), get_trigram_index())
@@ -0,0 +1,101 @@
+import time
+from tests.base import BaseTestCase
+from app.services.database import get_db
+from app.services.history_rollup import compact_batch, compact_history
+from app.services.trending import init_trending
+
+class TestHistoryRollup(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = get_db()
+        # Compaction works in id order, so start from history written in time order
+        self.db.execute("DELETE FROM Movie_Search_History")
+        old = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - 3 * 86400))
+        self.db.executemany(
+            "INSERT INTO Movie_Search_History (movie_id, search_timestamp) VALUES (?, ?)",
+            [(movie_id, old) for movie_id in (1, 1, 2, 3, 1, 2)]
+        )
+        self.db.executemany(
+            "INSERT INTO Movie_Search_History (movie_id) VALUES (?)", [(1,), (2,)]
+        )
+        self.db.commit()
+
+    def _rows(self, sql):
+        return sorted(tuple(row) for row in self.db.execute(sql))
+
+    def _totals(self):
+        raw = dict(tuple(row) for row in self.db.execute(
+            "SELECT movie_id, COUNT(*) FROM Movie_Search_History GROUP BY movie_id"
+        ))
+        for movie_id, count in self.db.execute(
+            "SELECT movie_id, SUM(count) FROM Search_History_Daily GROUP BY movie_id"
+        ):
+            raw[movie_id] = raw.get(movie_id, 0) + count
+        return raw
+
+    def _bucket_totals(self):
+        return dict(tuple(row) for row in self.db.execute(
+            "SELECT movie_id, SUM(count) FROM Search_Count_Buckets GROUP BY movie_id"
+        ))
+
+    def test_compaction_keeps_counters_and_totals(self):
+        """Test compaction rolls old rows into daily counts without touching trending counters"""
+        counters = self._rows("SELECT window_name, movie_id, score FROM Trending_Counters")
+        buckets = self._rows("SELECT bucket, movie_id, count FROM Search_Count_Buckets")
+        totals = self._totals()
+        recent = self.db.execute(
+            "SELECT COUNT(*) FROM Movie_Search_History WHERE search_timestamp >= datetime('now', '-1 day')"
+        ).fetchone()[0]
+
+        self.assertGreaterEqual(compact_history(self.db, 24, batch_size=2), 6)
+
+        self.assertEqual(self._rows("SELECT window_name, movie_id, score FROM Trending_Counters"), counters)
+        self.assertEqual(self._rows("SELECT bucket, movie_id, count FROM Search_Count_Buckets"), buckets)
+        self.assertEqual(self._totals(), totals)
+        self.assertEqual(
+            self.db.execute("SELECT COUNT(*) FROM Movie_Search_History").fetchone()[0], recent
+        )
+        self.assertEqual(compact_history(self.db, 24), 0)
+
+    def test_batches_are_incremental(self):
+        """Test each batch moves the watermark forward and stops at the first recent row"""
+        cutoff = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - 86400))
+        first = self.db.execute("SELECT rolled_through FROM History_Rollup").fetchone()[0]
+        while compact_batch(self.db, cutoff, batch_size=4):
+            pass
+        rolled_through = self.db.execute("SELECT rolled_through FROM History_Rollup").fetchone()[0]
+        self.assertGreater(rolled_through, first)
+        self.assertGreater(
+            self.db.execute("SELECT MIN(id) FROM Movie_Search_History").fetchone()[0], rolled_through
+        )
+
+    def test_deleting_recent_rows_still_decrements(self):
+        """Test rows that were never rolled up still take their searches back when deleted"""
+        compact_history(self.db, 24)
+        before = self._bucket_totals()
+        self.db.execute("DELETE FROM Movie_Search_History WHERE movie_id = 2")
+        self.db.commit()
+        after = self._bucket_totals()
+        self.assertLess(after.get(2, 0), before[2])
+        self.assertEqual(after[1], before[1])
+
+    def test_backfill_counts_rolled_up_history(self):
+        """Test rebuilt all-time counters still include searches that only survive as daily counts"""
+        totals = self._totals()
+        compact_history(self.db, 24)
+        self.assertTrue(self.db.execute("SELECT COUNT(*) FROM Search_History_Daily").fetchone()[0])
+
+        self.db.executescript("""
+            DROP TABLE Trending_Counters;
+            DROP TABLE Trending_Windows;
+            DROP TABLE Search_Count_Buckets;
+        """)
+        init_trending(self.db)
+        self.db.commit()
+        self.assertEqual(
+            dict(tuple(row) for row in self.db.execute(
+                "SELECT movie_id, CAST(score AS INTEGER) FROM Trending_Counters WHERE window_name = 'all'"
+            )),
+            totals
+        )
+
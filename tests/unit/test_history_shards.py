@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from app import create_app
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.database import close_pool, get_db
+from app.services.history_rollup import compact_history
+from app.services.history_shards import close_history_shards, get_shard_pools, shard_paths
+from app.services.snapshot import close_snapshot
+
+TITLES = ['Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo', 'Foxtrot', 'Golf', 'Hotel']
+
+class TestHistoryShards(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.apps = []
+
+    def tearDown(self):
+        for app in self.apps:
+            close_snapshot(app)
+            close_history_shards(app)
+            close_pool(app)
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def _sharded_app(self, shards: int):
+        database = os.path.join(self.tmpdir.name, f'sharded{shards}.db')
+        app = create_app('testing', DATABASE=database, HISTORY_SHARDS=shards, SEARCH_CACHE_SIZE=0)
+        self.apps.append(app)
+        with app.app_context():
+            db = get_db()
+            db.executemany("INSERT INTO Movies (title, release_year) VALUES (?, 2000)",
+                           [(title,) for title in TITLES])
+            db.commit()
+        return app
+
+    def _search_many(self, app, searches):
+        with app.app_context():
+            for title, times in searches.items():
+                for _ in range(times):
+                    Movie.search(title)
+
+    def test_history_goes_to_shards(self):
+        """Test searches land in the shard of their movie and trending merges every shard"""
+        app = self._sharded_app(3)
+        searches = {title: len(TITLES) - number for number, title in enumerate(TITLES)}
+        self._search_many(app, searches)
+
+        with app.app_context():
+            self.assertEqual(get_db().execute("SELECT COUNT(*) FROM Movie_Search_History").fetchone()[0], 0)
+            for number, path in enumerate(shard_paths(app.config)):
+                with sqlite3.connect(path) as conn:
+                    movie_ids = {row[0] for row in conn.execute("SELECT movie_id FROM Movie_Search_History")}
+                self.assertTrue(movie_ids)
+                self.assertTrue(all(movie_id % 3 == number for movie_id in movie_ids))
+
+            trending = Movie.get_trending(limit=len(TITLES))
+            self.assertEqual([movie.title for movie in trending], TITLES)
+            self.assertEqual([movie.view_count for movie in trending], list(searches.values()))
+
+            pages = []
+            after = None
+            while True:
+                page, after = Movie.get_trending_page(limit=3, after=after)
+                pages.extend(movie.title for movie in page)
+                if after is None:
+                    break
+            self.assertEqual(pages, TITLES)
+
+    def test_compaction_covers_shards(self):
+        """Test each shard compacts on its own without touching its counters"""
+        app = self._sharded_app(2)
+        self._search_many(app, {'Alpha': 2, 'Bravo': 1})
+        with app.app_context():
+            before = [movie.view_count for movie in Movie.get_trending(limit=2)]
+            for path in shard_paths(app.config):
+                with sqlite3.connect(path) as conn:
+                    compact_history(conn, retention_hours=-1)
+                    self.assertEqual(conn.execute("SELECT COUNT(*) FROM Movie_Search_History").fetchone()[0], 0)
+            self.assertEqual([movie.view_count for movie in Movie.get_trending(limit=2)], before)
+
+    def _throughput(self, shards: int, searches_per_thread: int = 15) -> float:
+        """Searches per second from one thread per title, with each history commit holding its shard's lock 5ms"""
+        app = self._sharded_app(shards)
+        with app.app_context():
+            for pool in get_shard_pools():
+                conns = [pool.acquire() for _ in range(pool.size)]
+                for conn in conns:
+                    conn.create_function('hold_lock', 0, lambda: time.sleep(0.005))
+                    conn.execute("""
+                        CREATE TEMP TRIGGER hold_lock AFTER INSERT ON main.Movie_Search_History
+                        BEGIN SELECT hold_lock(); END
+                    """)
+                for conn in conns:
+                    pool.release(conn)
+
+        threads = [threading.Thread(target=self._search_many, args=(app, {title: searches_per_thread}))
+                   for title in TITLES]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return len(TITLES) * searches_per_thread / (time.perf_counter() - started)
+
+    def test_throughput_grows_with_shards(self):
+        """Test concurrent searches contend less for history write locks with more shards"""
+        one = self._throughput(1)
+        four = self._throughput(4)
+        self.assertGreater(four, 2 * one)
@@ -0,0 +1,37 @@
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.database import get_db
+from app.services.history_writer import HistoryWriter
+
+class TestHistoryWriter(BaseTestCase):
+    def _history_count(self):
+        cursor = get_db().cursor()
+        cursor.execute("SELECT COUNT(*) FROM Movie_Search_History")
+        return cursor.fetchone()[0]
+
+    def test_search_records_history_in_one_batch(self):
+        """Test search records one history row per result"""
+        before = self._history_count()
+        results = Movie.search("Test")
+        self.assertEqual(self._history_count(), before + len(results))
+
+    def test_writer_flushes_batches(self):
+        """Test queued rows are written by the background thread"""
+        before = self._history_count()
+        writer = HistoryWriter(self.app.config['DATABASE'], batch_size=2, flush_interval=0.05)
+        try:
+            writer.record([1, 2, 3])
+            writer.flush()
+        finally:
+            writer.close()
+        self.assertEqual(writer.written, 3)
+        self.assertEqual(self._history_count(), before + 3)
+
+    def test_writer_drops_when_queue_full(self):
+        """Test a full queue drops rows instead of blocking"""
+        writer = HistoryWriter(self.app.config['DATABASE'], max_queue=2, flush_interval=60)
+        try:
+            writer.record([1, 2, 3] * 10000)
+            self.assertGreater(writer.dropped, 0)
+        finally:
+            writer.close()
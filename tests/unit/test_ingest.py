@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import tempfile
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.ingest import CatalogLoader, read_rows
+
+class TestCatalogIngest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.movies = os.path.join(self.tmpdir.name, 'movies.csv')
+        with open(self.movies, 'w', encoding='utf-8') as f:
+            f.write("title,release_year\nInterstellar,2014\nThe Matrix,1999\nTest Movie 1,2020\n")
+        self.availability = os.path.join(self.tmpdir.name, 'availability.jsonl')
+        with open(self.availability, 'w', encoding='utf-8') as f:
+            for title, year, service in [("Interstellar", 2014, "Hulu"),
+                                         ("The Matrix", 1999, "Netflix"),
+                                         ("Missing", 1900, "Netflix")]:
+                f.write(json.dumps({"title": title, "release_year": year, "service_name": service}) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def _ingest(self):
+        conn = sqlite3.connect(self.app.config['DATABASE'])
+        try:
+            with CatalogLoader(conn, chunk_size=2, report=lambda message: None) as loader:
+                loader.load_movies(read_rows(self.movies))
+                loader.load_services([{"service_name": "Hulu"}, {"service_name": "Netflix"}])
+                return loader.load_availability(read_rows(self.availability))
+        finally:
+            conn.close()
+
+    def test_ingest_resolves_by_natural_key(self):
+        """Test files load by natural key and derived data is rebuilt"""
+        self.assertEqual(self._ingest(), 2)
+
+        results = Movie.load_streaming_services(Movie.search("Interstellar"))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].streaming_services, ["Hulu"])
+        self.assertEqual(len(Movie.search("Test Movie 1")), 1)
+
+    def test_ingest_is_idempotent(self):
+        """Test re-running a load adds nothing and restores triggers"""
+        self._ingest()
+        self.assertEqual(self._ingest(), 0)
+
+        conn = sqlite3.connect(self.app.config['DATABASE'])
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM Movies").fetchone()[0]
+            triggers = conn.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'Movies'"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        self.assertEqual(count, 5)
+        self.assertGreater(triggers, 0)
+
+    def _catalog_objects(self, conn):
+        return set(conn.execute("""
+            SELECT type, name FROM sqlite_master
+            WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+            AND tbl_name IN ('Movies', 'Streaming_Services', 'Movie_Streamings')
+        """))
+
+    def test_failed_and_killed_loads_restore_schema(self):
+        """Test triggers and indexes come back after a load raises, and after one dies inside the block"""
+        conn = sqlite3.connect(self.app.config['DATABASE'])
+        try:
+            before = self._catalog_objects(conn)
+            self.assertTrue(any(object_type == 'index' for object_type, _ in before))
+
+            with self.assertRaises(RuntimeError):
+                with CatalogLoader(conn, report=lambda message: None) as loader:
+                    loader.load_movies([{"title": "Half Loaded", "release_year": 2001}])
+                    raise RuntimeError("load failed")
+            self.assertEqual(self._catalog_objects(conn), before)
+
+            # A killed process never reaches __exit__
+            CatalogLoader(conn, report=lambda message: None).__enter__()
+            self.assertEqual(self._catalog_objects(conn), set())
+            with CatalogLoader(conn, report=lambda message: None):
+                pass
+            self.assertEqual(self._catalog_objects(conn), before)
+        finally:
+            conn.close()
+        self.assertEqual([m.title for m in Movie.search("Half Loaded")], ["Half Loaded"])
+
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import tempfile
+import time
+from app import create_app
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.database import close_pool
+from app.services.migrations import SCHEMA_VERSION, migrate, schema_version
+from app.services.snapshot import close_snapshot
+
+class TestMigrations(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'migrate.db'))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def _names(self, object_type):
+        return {row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = ?", (object_type,)
+        )}
+
+    def test_migrate_new_database(self):
+        """Test a new database gets every table and index and the latest version"""
+        self.assertEqual(migrate(self.conn), SCHEMA_VERSION)
+        self.assertEqual(schema_version(self.conn), SCHEMA_VERSION)
+        self.assertTrue({'Movies', 'Movie_Streamings', 'Catalog_Version', 'Trending_Counters',
+                         'Search_History_Daily', 'History_Rollup'} <= self._names('table'))
+        self.assertTrue({'idx_search_history_movie_time', 'idx_movie_streamings_service',
+                         'idx_movies_title_nocase'} <= self._names('index'))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM Streaming_Services").fetchone()[0], 5)
+        self.assertIn('availability', {row[1] for row in self.conn.execute("PRAGMA table_info(Movies)")})
+
+    def test_migrate_is_idempotent(self):
+        """Test re-running is a no-op and a pre-versioning database is upgraded in place"""
+        self.conn.executescript("""
+            CREATE TABLE Movies (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, release_year INTEGER NOT NULL);
+            INSERT INTO Movies (title, release_year) VALUES ('Legacy Movie', 1990);
+        """)
+        migrate(self.conn)
+        self.conn.execute("DELETE FROM Streaming_Services WHERE service_name = 'Hulu'")
+        self.conn.commit()
+        migrate(self.conn)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM Streaming_Services").fetchone()[0], 4)
+        self.assertEqual(
+            self.conn.execute("SELECT rowid FROM Movies_FTS WHERE Movies_FTS MATCH 'legacy'").fetchall(), [(1,)]
+        )
+
+    def test_startup_skips_schema_writes(self):
+        """Test create_app on an up-to-date database does not wait on a concurrent writer"""
+        writer = sqlite3.connect(self.app.config['DATABASE'], isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            started = time.perf_counter()
+            app = create_app('testing')
+            elapsed = time.perf_counter() - started
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+        close_snapshot(app)
+        close_pool(app)
+        self.assertLess(elapsed, 1.0)
+        self.assertTrue(app.extensions['fts5'])
+
+    def test_movie_queries_use_indexes(self):
+        """Test no Movie query plan scans a whole table, but for the unfiltered LIKE fallback"""
+        self.app.extensions.pop('catalog_snapshot')
+        self.app.config['SEARCH_CACHE_SIZE'] = 0
+        with self.captured_statements() as statements:
+            Movie.search("Test")
+            Movie.search("Test", service="Netflix,Hulu", service_match='all', year_from=2000)
+            Movie.search_page("Test", limit=1, after=("Test Movie 1", 1))
+            list(Movie.iter_search("Test", service="netflix", limit=5))
+            Movie.get_by_id(1).streaming_services
+            Movie.load_streaming_services(Movie.get_many([1, 2, 99]))
+            for window in ('all', 'day', 'decay'):
+                Movie.get_trending_page(5, window, (1.0, 1))
+                Movie.get_trending_page(5, window)
+            self.app.config['SEARCH_USE_FTS'] = False
+            Movie.search("Test")
+            Movie.search("Test", service="Netflix", year_from=2000)
+        # Trending padding walks the rowid index in order and stops at its LIMIT;
+        # without FTS5 an unfiltered substring LIKE is a known full scan of Movies
+        like_scan = "LIKE '%Test%' ORDER BY"
+        self.assertTrue(any(like_scan in sql for sql in statements))
+        self.assertNoFullScans(statements, allow=("WHERE id NOT IN", like_scan))
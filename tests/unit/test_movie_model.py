@@ -1,5 +1,11 @@
+import json
+import time
 from tests.base import BaseTestCase
 from app.models.movie import Movie
+from app.services.database import get_db
+from app.services.json_fragments import get_fragment_cache
+from app.services.search_cache import get_search_cache
+from app.services.snapshot import SnapshotHolder
 
 class TestMovieModel(BaseTestCase):
     def test_movie_creation(self):
@@ -36,4 +42,108 @@ class TestMovieModel(BaseTestCase):
         
         # Test with service filter
         results = Movie.search("Test", service="Netflix")
-        self.assertTrue(all("Netflix" in m.streaming_services for m in results)) 
\ No newline at end of file
+        self.assertTrue(all("Netflix" in m.streaming_services for m in results))
+
+    def test_search_multiple_services_and_year_range(self):
+        """Test service lists with any/all matching and year ranges, with and without the snapshot"""
+        self.app.config['SEARCH_CACHE_SIZE'] = 0
+        for snapshot_enabled in (True, False):
+            if not snapshot_enabled:
+                self.app.extensions.pop('catalog_snapshot')
+            titles = lambda **kwargs: sorted(m.title for m in Movie.search("Movie", **kwargs))
+            self.assertEqual(titles(service="netflix, Amazon Prime"), ["Test Movie 1", "Test Movie 2"])
+            self.assertEqual(titles(service="Netflix,Amazon Prime", service_match='all'), ["Test Movie 1"])
+            self.assertEqual(titles(service="Netflix,Hulu", service_match='all'), [])
+            self.assertEqual(titles(year_from=2020), ["Test Movie 1", "Test Movie 2"])
+            self.assertEqual(titles(year_from=2019, year_to=2020, service="Netflix"), ["Test Movie 1"])
+            movies, next_after = Movie.search_page("Movie", service="Netflix", limit=1)
+            self.assertEqual([m.title for m in movies], ["Test Movie 1"])
+            self.assertEqual(next_after, ("Test Movie 1", 1))
+
+    def test_filtered_search_with_stale_snapshot(self):
+        """Test filtered searches see catalog writes the snapshot has not caught up with, cached or not"""
+        holder = SnapshotHolder(self.app.config['DATABASE'], refresh_interval=60)
+        self.app.extensions['catalog_snapshot'] = holder
+        deadline = time.monotonic() + 5
+        while holder.snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        db = get_db()
+        db.execute("INSERT INTO Movie_Streamings (movie_id, service_id) VALUES (3, 1)")
+        db.commit()
+        for _ in range(2):
+            titles = sorted(m.title for m in Movie.search("Movie", service="Netflix"))
+            self.assertEqual(titles, ["Another Movie", "Test Movie 1", "Test Movie 2"])
+
+    def test_search_token_prefix(self):
+        """Test FTS search matches title tokens by prefix"""
+        results = Movie.search("anoth mov")
+        self.assertEqual([m.title for m in results], ["Another Movie"])
+
+    def test_search_like_fallback(self):
+        """Test search falls back to LIKE when FTS is disabled"""
+        self.app.config['SEARCH_USE_FTS'] = False
+        results = Movie.search("ovie 1")
+        self.assertEqual([m.title for m in results], ["Test Movie 1"])
+
+    def test_search_cache(self):
+        """Test repeated searches hit the cache and catalog writes invalidate it"""
+        cache = get_search_cache()
+        Movie.search("Test")
+        results = Movie.search("  TEST ")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+        db = get_db()
+        db.execute("INSERT INTO Movies (title, release_year) VALUES ('Test Movie 3', 2022)")
+        db.commit()
+        results = Movie.search("Test")
+        self.assertEqual(len(results), 3)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_search_cache_hit_records_history(self):
+        """Test cache hits still record search history"""
+        db = get_db()
+        count = lambda: db.execute("SELECT COUNT(*) FROM Movie_Search_History").fetchone()[0]
+        Movie.search("Another")
+        before = count()
+        Movie.search("Another")
+        self.assertEqual(count(), before + 1)
+
+    def test_json_fragments(self):
+        """Test encoded movies are reused until the movie changes"""
+        movie = Movie.get_by_id(1)
+        self.assertEqual(json.loads(movie.to_json()), movie.to_dict())
+        self.assertIs(Movie.get_by_id(1).to_json(), movie.to_json())
+        self.assertEqual(get_fragment_cache().stats()['hits'], 2)
+
+        movie.view_count = 7
+        self.assertEqual(json.loads(movie.to_json())['view_count'], 7)
+
+        db = get_db()
+        db.execute("UPDATE Movies SET title = 'Renamed Movie' WHERE id = 1")
+        db.commit()
+        self.assertEqual(json.loads(Movie.get_by_id(1).to_json())['title'], 'Renamed Movie')
+        # A row read before the change no longer matches the snapshot and is encoded afresh
+        self.assertEqual(json.loads(movie.to_json())['title'], 'Test Movie 1')
+
+    def test_json_fragments_with_changed_services(self):
+        """Test rows read from SQL ahead of a snapshot refresh keep their own streaming services"""
+        holder = SnapshotHolder(self.app.config['DATABASE'], refresh_interval=60)
+        self.app.extensions['catalog_snapshot'] = holder
+        deadline = time.monotonic() + 5
+        while holder.snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(json.loads(Movie.get_by_id(3).to_json())['streaming_services'], [])
+
+        db = get_db()
+        db.execute("INSERT INTO Movie_Streamings (movie_id, service_id) VALUES (3, 1)")
+        db.commit()
+        row = db.execute("SELECT id, title, release_year, availability FROM Movies WHERE id = 3").fetchone()
+        fresh = Movie.from_row(row)
+        self.assertEqual(json.loads(fresh.to_json())['streaming_services'], ['Netflix'])
+        self.assertEqual(json.loads(fresh.to_json(include_streaming=False)), {'id': 3, 'title': 'Another Movie', 'year': 2019})
+
+        holder.refresh(db)
+        self.assertEqual(json.loads(Movie.get_by_id(3).to_json())['streaming_services'], ['Netflix'])
+        self.assertEqual(json.loads(fresh.to_json())['streaming_services'], ['Netflix'])
@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import unittest
+import urllib.request
+from app import create_app
+from tests.base import BaseTestCase
+from app.models.movie import Movie
+from app.services.database import close_pool, get_db
+from app.services.history_writer import HistoryChannel
+from app.services.prefork import RESTART_DELAY, PreforkServer, _spawn
+from app.services.snapshot import close_snapshot
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class TestPrefork(BaseTestCase):
+    def test_read_only_connections(self):
+        """Test DB_READ_ONLY connections serve reads, refuse writes and send history to the channel"""
+        app = create_app('testing', DB_READ_ONLY=True, HISTORY_ASYNC=True)
+        channel = multiprocessing.get_context('fork').Queue()
+        app.extensions['history_writer'] = HistoryChannel(channel)
+        try:
+            with app.app_context():
+                db = get_db()
+                self.assertIn('mode=ro', app.extensions['db_pool'].database)
+                with self.assertRaises(sqlite3.OperationalError):
+                    db.execute("INSERT INTO Movies (title, release_year) VALUES ('Nope', 2000)")
+                movies = Movie.search("Test")
+                self.assertTrue(movies)
+                self.assertTrue(Movie.get_trending())
+            self.assertEqual(channel.get(timeout=5)[1], [movie.id for movie in movies])
+        finally:
+            app.extensions['history_writer'].close()
+            close_snapshot(app)
+            close_pool(app)
+
+    def test_history_channel(self):
+        """Test workers hand search history to the channel and drop when it is full"""
+        channel = multiprocessing.get_context('fork').Queue(maxsize=1)
+        history = HistoryChannel(channel)
+        history.record([1, 2])
+        history.record([3])
+        timestamp, movie_ids = channel.get(timeout=5)
+        self.assertEqual(movie_ids, [1, 2])
+        self.assertEqual((history.written, history.dropped), (2, 1))
+        history.close()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "prefork needs os.fork")
+    def test_children_drop_master_signal_handlers(self):
+        """Test a forked child is killed by SIGTERM before it installs its own handlers"""
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+        try:
+            pid = _spawn(lambda: time.sleep(30))
+            os.kill(pid, signal.SIGTERM)
+            _, status = os.waitpid(pid, 0)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        self.assertTrue(os.WIFSIGNALED(status))
+        self.assertEqual(os.WTERMSIG(status), signal.SIGTERM)
+
+    def test_restarts_wait_for_restart_delay(self):
+        """Test a child that died right after starting is not restarted before RESTART_DELAY"""
+        server = PreforkServer('testing', workers=1)
+        spawned = []
+        server._spawn_worker = spawned.append
+        server.started_at[0] = time.monotonic()
+        server.restarts[0] = server.started_at[0] + RESTART_DELAY
+        server._restart_due()
+        self.assertEqual(spawned, [])
+        server.restarts[0] = time.monotonic()
+        server._restart_due()
+        self.assertEqual((spawned, server.restarts), ([0], {}))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "prefork needs os.fork")
+    def test_serve_records_history_once(self):
+        """Test forked workers answer on one socket and the writer records their history"""
+        db = get_db()
+        db.execute("DELETE FROM Movie_Search_History")
+        db.commit()
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, 'serve.py', '--config', 'testing', '--host', '127.0.0.1',
+             '--port', str(port), '--workers', '2'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    urllib.request.urlopen(base_url + '/api/health').read()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            for _ in range(5):
+                with urllib.request.urlopen(base_url + '/api/movies/search?q=Test') as response:
+                    self.assertEqual(response.status, 200)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            self.assertEqual(server.wait(timeout=30), 0)
+        count = db.execute("SELECT COUNT(*) FROM Movie_Search_History").fetchone()[0]
+        self.assertEqual(count, 5 * 2)
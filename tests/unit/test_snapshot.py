@@ -0,0 +1,58 @@
+import time
+from tests.base import BaseTestCase
+from app.services.database import get_db
+from app.services.search_filters import SearchFilters
+from app.services.snapshot import CatalogSnapshot, SnapshotHolder, get_snapshot
+
+class TestCatalogSnapshot(BaseTestCase):
+    def test_snapshot_contents(self):
+        """Test movies, services and availability are copied from the database"""
+        snapshot = CatalogSnapshot.load(get_db())
+        self.assertEqual(snapshot.services, ('Amazon Prime', 'Netflix'))
+        record = snapshot.movies[1]
+        self.assertEqual((record.title, record.release_year), ('Test Movie 1', 2020))
+        self.assertEqual(record.services, ('Netflix', 'Amazon Prime'))
+        self.assertIs(record.services[0], snapshot.movies[2].services[0])
+        self.assertEqual(snapshot.movies[3].services, ())
+
+    def test_snapshot_swapped_on_version_change(self):
+        """Test a catalog write publishes a new snapshot instead of mutating the old one"""
+        before = get_snapshot()
+        self.assertIs(get_snapshot(), before)
+
+        db = get_db()
+        db.execute("INSERT INTO Movies (title, release_year) VALUES ('Fresh Movie', 2024)")
+        db.commit()
+        after = get_snapshot()
+        self.assertIsNot(after, before)
+        self.assertNotIn(4, before.movies)
+        self.assertEqual(after.movies[4].title, 'Fresh Movie')
+
+    def test_incremental_refresh(self):
+        """Test changed movies are patched into a copy along with their bitmaps"""
+        before = get_snapshot()
+        db = get_db()
+        db.execute("UPDATE Movies SET release_year = 2018 WHERE id = 2")
+        db.execute("DELETE FROM Movie_Streamings WHERE movie_id = 1 AND service_id = 2")
+        db.commit()
+
+        after = get_snapshot()
+        self.assertIs(after.movies[3], before.movies[3])
+        self.assertEqual(after.movies[2].release_year, 2018)
+        self.assertEqual(after.movies[1].services, ('Netflix',))
+        self.assertNotIn('amazon prime', after.service_bitmaps)
+        self.assertNotIn(2021, after.year_bitmaps)
+        self.assertIn(2, after.filter_bitmap(SearchFilters.build(year=2018)))
+        self.assertIn(2, before.filter_bitmap(SearchFilters.build(year=2021)))
+
+    def test_background_refresh(self):
+        """Test a polling holder builds the snapshot off the request path"""
+        holder = SnapshotHolder(self.app.config['DATABASE'], refresh_interval=60)
+        try:
+            deadline = time.monotonic() + 5
+            while holder.snapshot is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIsNotNone(holder.current())
+            self.assertEqual(holder.current().movies[2].title, 'Test Movie 2')
+        finally:
+            holder.close()
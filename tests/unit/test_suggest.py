@@ -0,0 +1,53 @@
+import threading
+import time
+from tests.base import BaseTestCase
+from app.services.catalog_index import CatalogIndex
+from app.services.database import get_db
+from app.services.suggest import SuggestIndex, _build_index, get_suggest_index
+
+class TestSuggestIndex(BaseTestCase):
+    def test_prefix_ranked_by_popularity(self):
+        """Test every word start matches and more searched titles rank first"""
+        index = SuggestIndex(
+            [(1, 'The Matrix'), (2, 'The Matrix Reloaded'), (3, 'Mathilda'), (4, 'Heat')],
+            {2: 10, 3: 5}, version=0
+        )
+        self.assertEqual([movie_id for movie_id, _ in index.suggest('mat')], [2, 3, 1])
+        self.assertEqual(index.suggest('MATRIX rel'), [(2, 'The Matrix Reloaded')])
+        self.assertEqual([movie_id for movie_id, _ in index.suggest('the ma', limit=1)], [2])
+        self.assertEqual(index.suggest('he'), [(4, 'Heat')])
+        self.assertEqual(index.suggest('  '), [])
+
+    def test_index_rebuilt_after_catalog_change(self):
+        """Test the app's index picks up new titles and search counts"""
+        self.assertEqual(get_suggest_index().suggest('test'), [(1, 'Test Movie 1'), (2, 'Test Movie 2')])
+
+        db = get_db()
+        db.execute("INSERT INTO Movies (title, release_year) VALUES ('Testament', 2023)")
+        db.commit()
+        self.assertIn((4, 'Testament'), get_suggest_index().suggest('testa'))
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_rebuild_off_request_thread(self):
+        """Test a stale index keeps answering while its replacement builds in the background"""
+        self.app.config['CATALOG_SNAPSHOT_REFRESH'] = 60
+        release = threading.Event()
+        release.set()
+        holder = CatalogIndex(self.app, 'suggest index', lambda db: release.wait(5) and _build_index(db))
+        self._wait_for(lambda: holder.index is not None)
+        before = holder.current()
+
+        release.clear()
+        db = get_db()
+        db.execute("INSERT INTO Movies (title, release_year) VALUES ('Testament', 2023)")
+        db.commit()
+        self.assertIs(holder.current(), before)
+        self.assertNotIn((4, 'Testament'), before.suggest('testa'))
+
+        release.set()
+        self._wait_for(lambda: holder.index is not before)
+        self.assertIn((4, 'Testament'), holder.current().suggest('testa'))
@@ -0,0 +1,43 @@
+import sqlite3
+from tests.base import BaseTestCase
+from app.services.database import get_db
+from app.services.trending import current_bucket, refresh_windows
+
+class TestTrendingWindows(BaseTestCase):
+    def _hour_scores(self, db):
+        return dict(db.execute("SELECT movie_id, score FROM Trending_Counters WHERE window_name = 'hour'"))
+
+    def test_concurrent_refresh_expires_buckets_once(self):
+        """Test two connections refreshing at the hour boundary subtract expired buckets once"""
+        db = get_db()
+        now = current_bucket()
+        # The fixture's searches become two hours old, plus one search for movie 1 this hour
+        db.executescript(f"""
+            UPDATE Search_Count_Buckets SET bucket = {now - 2};
+            UPDATE Trending_Windows SET expired_through = {now - 5} WHERE window_name = 'hour';
+            INSERT INTO Movie_Search_History (movie_id) VALUES (1);
+        """)
+        db.commit()
+        self.assertEqual(self._hour_scores(db)[1], 4)
+        self.app.extensions['trending_refreshed'] = {}
+
+        other = sqlite3.connect(self.app.config['DATABASE'], timeout=5)
+        raced = []
+
+        def race(sql):
+            # The other connection refreshes between this one reading the watermarks and writing
+            if sql.startswith('BEGIN') and not raced:
+                raced.append(sql)
+                refresh_windows(other)
+
+        db.set_trace_callback(race)
+        try:
+            refresh_windows(db)
+        finally:
+            db.set_trace_callback(None)
+            other.close()
+
+        self.assertTrue(raced)
+        self.assertEqual(self._hour_scores(db), {1: 1})
+        self.assertEqual(db.execute("SELECT expired_through FROM Trending_Windows WHERE window_name = 'hour'")
+                         .fetchone()[0], now - 1)